@@ -1,9 +1,17 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from data_processing import finalize_data
+from data_processing import get_indexed_dataset
+from dataset_holder import copy_on_write_enabled
+from schema import for_display
 from datetime import datetime
 
+# Every session shares the datasets data_processing holds. With copy-on-write, a page that
+# changes its frame copies the data first instead of changing it for everyone, so pages can
+# be handed views instead of full copies. It's a process-wide pandas setting, made here once.
+if not copy_on_write_enabled():
+    pd.set_option('mode.copy_on_write', True)
+
 # Set the title and favicon that appear in the Browser's tab bar.
 st.set_page_config(
     page_title='User Growth',
@@ -11,7 +19,8 @@ st.set_page_config(
 )
 
 # Return data from data_processing
-df_discovery, df_sap, df_merged, df_combined_au_capture, df_capture_sheet3 = finalize_data()
+df_combined_au_capture, indexes = get_indexed_dataset('au_capture')
+dates, learner_counts = indexes.dates, indexes.counts
 
 # Display logo at the top of the sidebar
 st.logo('kognisi_logo.png')
@@ -41,8 +50,8 @@ In the User Growth Discovery - Capture, the key user metrics include:
 st.markdown('---')
 
 # Tentukan nilai min dan max untuk tanggal
-min_value = df_combined_au_capture['created_at'].min()
-max_value = df_combined_au_capture['created_at'].max()
+min_value = dates.min().date()
+max_value = dates.max().date()
 
 # Inisialisasi session state untuk filter tanggal
 if 'from_date' not in st.session_state:
@@ -88,10 +97,7 @@ st.session_state.from_date = from_date
 st.session_state.to_date = to_date
 
 # Filter data berdasarkan rentang tanggal
-filtered_df = df_combined_au_capture[
-    (df_combined_au_capture['created_at'] >= from_date) & 
-    (df_combined_au_capture['created_at'] <= to_date)
-]
+filtered_df = dates.between(df_combined_au_capture, from_date, to_date)
 
 # Filter tambahan berdasarkan platform
 if selected_platform != 'All':
@@ -104,10 +110,11 @@ if selected_status != 'All':
 # Active Users section
 st.header('Active User', divider='gray')
 
-# Calculate the distinct counts of users based on email
-total_count = filtered_df['email'].nunique()  # Total registered users (unique emails)
-Active_count = filtered_df[filtered_df['learner_status'] == 'Active']['email'].nunique()  # Unique Active users
-Passive_count = filtered_df[filtered_df['learner_status'] == 'Passive']['email'].nunique()  # Unique Ppassive users
+# Calculate the distinct counts of users from the precomputed daily counts (same as nunique on the filtered rows)
+platform = None if selected_platform == 'All' else selected_platform
+total_count = learner_counts.count(from_date, to_date, platform=platform, learner_status=None if selected_status == 'All' else selected_status)  # Total registered users
+Active_count = learner_counts.count(from_date, to_date, platform=platform, learner_status='Active') if selected_status in ('All', 'Active') else 0  # Unique Active users
+Passive_count = learner_counts.count(from_date, to_date, platform=platform, learner_status='Passive') if selected_status in ('All', 'Passive') else 0  # Unique Passive users
 
 # Display metrics column
 col1, col2, col3 = st.columns(3)
@@ -123,8 +130,8 @@ st.subheader('Register User Distribution', divider='gray')
 
 # Create a line chart for active users based on created_at
 active_user_counts = (filtered_df
-                      .groupby('created_at')
-                      .agg(active_users=('email', 'nunique'))
+                      .groupby('created_at', observed=True)
+                      .agg(active_users=('learner_id', 'nunique'))
                       .reset_index())
 
 # Create a line chart for active learners
@@ -150,15 +157,15 @@ st.altair_chart(line_chart, use_container_width=True)
 
 # Breakdown data table for active users
 with st.expander("View Active Users Breakdown"):
-    st.dataframe(active_user_counts)
+    st.dataframe(for_display(active_user_counts))
 
 # Platform Distribution
 st.subheader('Platform Distribution', divider='gray')
 
 # Create a bar chart breakdown by platform and learner_status
 platform_breakdown = (filtered_df
-                      .groupby(['platform', 'learner_status'])
-                      .agg(active_users=('email', 'nunique'))
+                      .groupby(['platform', 'learner_status'], observed=True)
+                      .agg(active_users=('learner_id', 'nunique'))
                       .reset_index())
 
 # Generate the stacked bar chart using Altair
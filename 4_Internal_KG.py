@@ -1,14 +1,14 @@
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-from data_processing import finalize_data
+from data_processing import get_dataset
 from datetime import datetime
 
 # Set the title and favicon in the browser tab
 st.set_page_config(page_title='Internal KG', page_icon='👥')
 
 # Retrieve data from data_processing
-df_discovery, df_sap, df_merged, df_combined_au_capture, df_capture_sheet3 = finalize_data()
+df_merged = get_dataset('merged')
 
 # Display logo at the top of the sidebar
 st.logo('kognisi_logo.png')
@@ -20,15 +20,6 @@ with col1:
 with col3:
     st.image('growth_center.png')
 
-# Fungsi untuk memuat dan memproses data dengan caching
-@st.cache_data
-def load_and_process_data():
-    # Mengambil dan memproses data
-    df_discovery, df_sap, df_merged, df_combined_au_capture, df_capture_sheet3 = finalize_data()
-
-# Memuat data dengan caching
-merged_df = load_and_process_data()
-
 # Memfilter data untuk pengguna internal
 internal_df = df_merged[df_merged['status_learner'] == 'Internal']
 
@@ -52,7 +43,9 @@ internal_df = internal_df[internal_df['title'] == selected_bundle]
 internal_df = internal_df[internal_df['Test Name'] == selected_test]
 
 # Treemap untuk jumlah peserta tes per unit
-treemap_data = internal_df.groupby(['Test Name', 'unit']).size().reset_index(name='Unit Count')
+treemap_data = internal_df.groupby(['Test Name', 'unit'], observed=True).size().reset_index(name='Unit Count')
+# px.treemap builds its hierarchy with operations categoricals don't support
+treemap_data = treemap_data.astype({'Test Name': object, 'unit': object})
 fig3 = px.treemap(
     treemap_data, 
     title='Test Taker Per Unit', 
@@ -66,7 +59,8 @@ fig3.update_layout(width=400, height=650)
 st.plotly_chart(fig3, use_container_width=True)
 
 # Diagram lingkaran untuk distribusi typology
-typology_counts = internal_df['typology'].value_counts().reset_index()
+# value_counts lists every category of a categorical column, so drop the ones absent here
+typology_counts = internal_df['typology'].value_counts().loc[lambda counts: counts > 0].reset_index()
 typology_counts.columns = ['typology', 'User Count']
 typology_counts = typology_counts.sort_values(by='User Count', ascending=False)
 fig_typology = px.pie(
@@ -86,10 +80,10 @@ st.plotly_chart(fig_typology, use_container_width=True)
 
 # Diagram batang bertumpuk untuk hasil per unit
 # Grouping by unit and typology, counting users
-typology_counts = internal_df.groupby(['unit', 'typology']).size().reset_index(name='User Count')
+typology_counts = internal_df.groupby(['unit', 'typology'], observed=True).size().reset_index(name='User Count')
 
 # Sorting units by total user count
-unit_total_counts = typology_counts.groupby('unit')['User Count'].sum().reset_index()
+unit_total_counts = typology_counts.groupby('unit', observed=True)['User Count'].sum().reset_index()
 unit_total_counts = unit_total_counts.sort_values(by='User Count', ascending=False)
 sorted_units = unit_total_counts['unit']
 
@@ -120,8 +114,8 @@ fig_stacked.update_traces(texttemplate='%{text:.0f}')  # Display raw count in th
 st.plotly_chart(fig_stacked, use_container_width=True)
 
 # Diagram batang bertumpuk untuk gender berdasarkan count
-gender_counts = internal_df.groupby(['gender', 'typology']).size().reset_index(name='User Count')
-gender_total_counts = gender_counts.groupby('gender')['User Count'].sum().reset_index()
+gender_counts = internal_df.groupby(['gender', 'typology'], observed=True).size().reset_index(name='User Count')
+gender_total_counts = gender_counts.groupby('gender', observed=True)['User Count'].sum().reset_index()
 gender_total_counts = gender_total_counts.sort_values(by='User Count', ascending=False)
 sorted_genders = gender_total_counts['gender']
 
@@ -147,8 +141,8 @@ fig_gender.update_traces(texttemplate='%{text:.0f}')
 st.plotly_chart(fig_gender, use_container_width=True)
 
 # Diagram batang bertumpuk untuk generasi berdasarkan count
-generation_counts = internal_df.groupby(['generation', 'typology']).size().reset_index(name='User Count')
-generation_total_counts = generation_counts.groupby('generation')['User Count'].sum().reset_index()
+generation_counts = internal_df.groupby(['generation', 'typology'], observed=True).size().reset_index(name='User Count')
+generation_total_counts = generation_counts.groupby('generation', observed=True)['User Count'].sum().reset_index()
 generation_total_counts = generation_total_counts.sort_values(by='User Count', ascending=False)
 sorted_generations = generation_total_counts['generation']
 
@@ -174,8 +168,8 @@ fig_generation.update_traces(texttemplate='%{text:.0f}')
 st.plotly_chart(fig_generation, use_container_width=True)
 
 # Diagram batang bertumpuk untuk layer berdasarkan count
-layer_counts = internal_df.groupby(['layer', 'typology']).size().reset_index(name='User Count')
-layer_total_counts = layer_counts.groupby('layer')['User Count'].sum().reset_index()
+layer_counts = internal_df.groupby(['layer', 'typology'], observed=True).size().reset_index(name='User Count')
+layer_total_counts = layer_counts.groupby('layer', observed=True)['User Count'].sum().reset_index()
 layer_total_counts = layer_total_counts.sort_values(by='User Count', ascending=False)
 sorted_layers = layer_total_counts['layer']
 
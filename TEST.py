@@ -1,14 +1,14 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from data_processing import finalize_data
+from data_processing import get_dataset
 from datetime import datetime
 
 # Set the title and favicon in the browser tab
 st.set_page_config(page_title='Demography', page_icon='🌍')
 
 # Retrieve data from data_processing
-df_discovery, df_sap, df_merged, df_combined_au_capture, df_capture_sheet3 = finalize_data()
+df_merged = get_dataset('merged')
 st.dataframe (df_merged)
 
 # Display logo at the top of the sidebar
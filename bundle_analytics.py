@@ -0,0 +1,54 @@
+"""Typology and final-result distributions of every bundle (title), each computed in one grouped pass.
+
+The tables are tidy, with one row per bundle and value, so a page computes them once per
+rerun and slices out the bundles it shows with ``for_bundle``.
+"""
+
+
+def typology_distribution(df, count_column='Customer ID'):
+    """Learners (distinct ``count_column``, a missing value counting as one) per title, Test Name
+    and typology, with each typology's percentage of its test."""
+    distribution = (df.groupby(['title', 'Test Name', 'typology'], observed=True)[count_column]
+                    .nunique(dropna=False)
+                    .reset_index(name='Active Users'))
+    totals = distribution.groupby(['title', 'Test Name'], observed=True)['Active Users'].transform('sum')
+    distribution['Percentage'] = (distribution['Active Users'] / totals * 100).round(2)
+    return distribution
+
+
+def final_result_distribution(best_scores):
+    """Attempts (Customer ID and date) per title and final result, most frequent first, from the
+    best-score rows of each attempt.
+
+    Like ``value_counts`` on each bundle, only the final results its attempts got are listed;
+    ties are in alphabetical order.
+    """
+    attempts = best_scores[['title', 'Customer ID', 'last_updated', 'final_result']].drop_duplicates()
+    counts = (attempts.groupby(['title', 'final_result'], observed=True)
+              .size()
+              .reset_index(name='Count')
+              .sort_values(['title', 'Count'], ascending=[True, False], kind='stable'))
+    counts['Percentage'] = counts['Count'] / counts.groupby('title', observed=True)['Count'].transform('sum') * 100
+    return counts.rename(columns={'final_result': 'Final Result'})
+
+
+def overall_final_results(latest_results, participants, titles):
+    """"Overall <title>" rows for the traits summary: learners per final result of each of ``titles``,
+    as a share of the bundle's participants (``participants`` has title and jumlah_partisipan)."""
+    overall = (latest_results[latest_results['title'].isin(titles)]
+               .groupby(['title', 'final_result'], observed=True)['learner_id']
+               .nunique()
+               .reset_index(name='jumlah'))
+    overall['title'] = overall['title'].astype(object)
+    overall = overall.merge(participants.astype({'title': object}), on='title', how='left')
+    overall['Test Name'] = 'Overall ' + overall['title']
+    overall['typology'] = overall['final_result'].astype(object)
+    overall['persentase'] = (overall['jumlah'] / overall['jumlah_partisipan'] * 100).round(2)
+    # Bundles in the order of ``titles``
+    overall = overall.iloc[overall['title'].map(titles.index).argsort(kind='stable')]
+    return overall[['title', 'jumlah_partisipan', 'Test Name', 'typology', 'jumlah', 'persentase']].reset_index(drop=True)
+
+
+def for_bundle(table, title):
+    """The rows of ``title`` in one of the tables above, without the title column."""
+    return table[table['title'] == title].drop(columns='title').reset_index(drop=True)
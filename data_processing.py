@@ -1,112 +1,742 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from fetch_data import fetch_data_discovery, fetch_data_discovery_al, fetch_data_discovery_au, fetch_data_sap, fetch_data_capture
-
-@st.cache_data
-@st.cache_data
-def fill_empty_with_na(df, value='N/A'):
-    """Fill empty or None values in the DataFrame with the specified value."""
-    return df.replace(['', None, '#VALUE!'], value).fillna(value)
-
-@st.cache_data
-def fetch_discovery_data():
-    df_discovery = fetch_data_discovery()
-    df_discovery['email'] = df_discovery['email'].str.strip().str.lower()
-    return fill_empty_with_na(df_discovery)
-
-@st.cache_data
-def fetch_discovery_al_data():
-    df_discovery_al = fetch_data_discovery_al()
-    df_discovery_al['email'] = df_discovery_al['email'].str.strip().str.lower()
-    return fill_empty_with_na(df_discovery_al)
-
-@st.cache_data
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import partial
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from dataset_holder import DatasetHolder, RefreshScheduler
+from date_index import DateIndex
+from distinct_counts import DailyDistinctCounts, SketchedDistinctCounts
+from enrichment import LookupIndex
+from filter_index import FilterIndex
+from fetch_data import (
+    CAPTURE_SPREADSHEET, DISCOVERY_RESULTS_QUERY, SAP_SPREADSHEET, discovery_fingerprint, fetch_data_capture,
+    fetch_data_discovery, fetch_data_discovery_al, fetch_data_discovery_au, fetch_data_discovery_results,
+    fetch_data_sap,
+    project_discovery, project_discovery_al, spreadsheet_revision,
+)
+from identity import LearnerIndex, normalize_email
+from normalization import clean_company, layer_group, normalize_gender, to_category
+from schema import DIMENSION_COLUMNS, apply_schema
+from snapshot_store import DEFAULT_SNAPSHOT_DIR, load_frames, load_frames_meta, save_frames
+from source_cache import SourceCache
+
+logger = logging.getLogger(__name__)
+
+def fetch_discovery_data(df_discovery=None):
+    if df_discovery is None:
+        df_discovery = fetch_data_discovery()
+    df_discovery['email'] = normalize_email(df_discovery['email'])
+    return apply_schema(df_discovery)
+
+def fetch_discovery_al_data(df_discovery_al=None):
+    if df_discovery_al is None:
+        df_discovery_al = fetch_data_discovery_al()
+    df_discovery_al['email'] = normalize_email(df_discovery_al['email'])
+    return apply_schema(df_discovery_al)
+
 def fetch_discovery_au_data():
-    df_discovery_au = fetch_data_discovery_au()
-    df_discovery_au['email'] = df_discovery_au['email'].str.strip().str.lower()
-    return fill_empty_with_na(df_discovery_au)
+    # result_created_at is only there as the incremental sync watermark
+    df_discovery_au = fetch_data_discovery_au().drop(columns=['result_created_at'])
+    df_discovery_au['email'] = normalize_email(df_discovery_au['email'])
+    return apply_schema(df_discovery_au)
+
+# Columns kept from the SAP sheet
+SAP_COLUMNS = ['name_sap', 'email', 'nik', 'unit', 'subunit', 'admin_hr', 'layer', 'generation', 'gender', 'division', 'department', 'tenure']
 
-@st.cache_data
 def fetch_sap_data():
-    selected_columns = ['name_sap', 'email', 'nik', 'unit', 'subunit', 'admin_hr', 'layer', 'generation', 'gender', 'division', 'department', 'tenure']
-    df_sap = fetch_data_sap(selected_columns)
-    df_sap['email'] = df_sap['email'].str.strip().str.lower()
+    df_sap = fetch_data_sap(SAP_COLUMNS)
+    df_sap['email'] = normalize_email(df_sap['email'])
     df_sap['nik'] = df_sap['nik'].astype(str).str.zfill(6)
-    return fill_empty_with_na(df_sap)
-
-@st.cache_data
-def fetch_capture_data():
-    df_capture_sheet1, df_capture_sheet2, df_capture_sheet3 = fetch_data_capture()
-    df_capture_sheet1['email'] = df_capture_sheet1['email'].str.strip().str.lower()
-    df_capture_sheet2['email'] = df_capture_sheet2['email'].str.strip().str.lower()
-    df_capture_sheet3['email'] = df_capture_sheet3['email'].str.strip().str.lower()
-    df_capture_sheet1 = fill_empty_with_na(df_capture_sheet1)
-    df_capture_sheet2 = fill_empty_with_na(df_capture_sheet2)
-    df_capture_sheet3 = fill_empty_with_na(df_capture_sheet3)
-    df_capture_sheet3['done_at'] = pd.to_datetime(df_capture_sheet3['done_at'], format="%Y-%m-%d", errors='coerce').dt.date
-    return df_capture_sheet1, df_capture_sheet2, df_capture_sheet3
-
-@st.cache_data
-def finalize_data():
-    df_discovery = fetch_discovery_data()
-    df_discovery_al = fetch_discovery_al_data()
-    df_discovery_au = fetch_discovery_au_data()
-    df_sap = fetch_sap_data()
-    df_capture_sheet1, df_capture_sheet2, df_capture_sheet3 = fetch_capture_data()
+    return apply_schema(df_sap)
+
+def fetch_capture_sheet_data(df_capture_sheet):
+    df_capture_sheet['email'] = normalize_email(df_capture_sheet['email'])
+    return apply_schema(df_capture_sheet)
+
+# Sources in the order finalize_data used to load them
+SOURCE_NAMES = ['discovery', 'discovery_al', 'discovery_au', 'sap', 'capture_sheet1', 'capture_sheet2', 'capture_sheet3']
+
+# Default seconds a source is served before its fingerprint is re-checked, overridable via [cache.<source>] secrets
+SOURCE_TTLS = {
+    'discovery_results': 300,
+    'discovery': 300,
+    'discovery_al': 300,
+    'discovery_au': 300,
+    'sap': 900,
+    'capture': 900,
+    'capture_sheet1': 900,
+    'capture_sheet2': 900,
+    'capture_sheet3': 900,
+}
+
+
+# Per-source cache shared by every session; each source is revalidated by its own fingerprint
+@st.cache_resource
+def get_source_cache():
+    cache_secrets = st.secrets.get("cache", {})
+    cache = SourceCache()
+
+    def register(name, fetch, fingerprint=None, follows=None):
+        source_secrets = cache_secrets.get(name, {})
+        cache.register(
+            name, fetch, fingerprint,
+            ttl=float(source_secrets.get("ttl_seconds", SOURCE_TTLS[name])),
+            max_age=float(source_secrets.get("max_age_hours", 24)) * 3600,
+            follows=follows,
+        )
+
+    if st.secrets.get("discovery", {}).get("single_query", False):
+        # Run the join shared by the Discovery and Active Learner queries once; both sources are
+        # projected from it and count as changed whenever it is refetched
+        register('discovery_results', fetch_data_discovery_results, partial(discovery_fingerprint, DISCOVERY_RESULTS_QUERY))
+        register('discovery', lambda: fetch_discovery_data(project_discovery(cache.get('discovery_results'))),
+                 follows='discovery_results')
+        register('discovery_al', lambda: fetch_discovery_al_data(project_discovery_al(cache.get('discovery_results'))),
+                 follows='discovery_results')
+    else:
+        register('discovery', fetch_discovery_data, partial(discovery_fingerprint, 'query_discovery.sql'))
+        register('discovery_al', fetch_discovery_al_data, partial(discovery_fingerprint, 'query_DiscoveryAL.sql'))
+    register('discovery_au', fetch_discovery_au_data, partial(discovery_fingerprint, 'query_DiscoveryAU.sql'))
+    register('sap', fetch_sap_data, partial(spreadsheet_revision, SAP_SPREADSHEET))
+    # The three Capture worksheets are downloaded together in one batched request
+    register('capture', fetch_data_capture, partial(spreadsheet_revision, CAPTURE_SPREADSHEET))
+    for index in range(3):
+        register(f'capture_sheet{index + 1}',
+                 partial(lambda index: fetch_capture_sheet_data(cache.get('capture')[index].copy()), index),
+                 follows='capture')
+    return cache
+
+# Default per-source timeouts (seconds) for the concurrent loader, overridable via [loader] secrets
+SOURCE_TIMEOUTS = {
+    'discovery': 300,
+    'discovery_al': 300,
+    'discovery_au': 300,
+    'sap': 120,
+    'capture_sheet1': 120,
+    'capture_sheet2': 120,
+    'capture_sheet3': 120,
+}
+
+# Empty result used when a source fails or times out and has no snapshot to fall back to
+SOURCE_EMPTY_RESULTS = {
+    'sap': lambda: pd.DataFrame(columns=SAP_COLUMNS),
+}
+
+# Bump whenever the shape or meaning of the stored frames changes, so older snapshots are ignored
+SNAPSHOT_SCHEMA_VERSION = 8
+
+# Names of the frames finalize_data returns, in order
+FINALIZED_FRAMES = ['discovery', 'sap', 'merged', 'au_capture', 'capture_sheet3']
+
+# How often (seconds) a held dataset re-checks the snapshot for a newer version or expiry
+SNAPSHOT_CHECK_SECONDS = 600
+
+
+def snapshot_settings():
+    """Snapshot options from the [snapshot] secrets section."""
+    snapshot_secrets = st.secrets.get("snapshot", {})
+    return {
+        'enabled': snapshot_secrets.get("enabled", True),
+        'dir': snapshot_secrets.get("dir", DEFAULT_SNAPSHOT_DIR),
+        'ttl_seconds': float(snapshot_secrets.get("ttl_hours", 24)) * 3600,
+    }
+
+
+def _snapshot_meta():
+    return {'schema_version': SNAPSHOT_SCHEMA_VERSION, 'created_at': time.time()}
+
+
+def load_valid_snapshot(name, settings, frame_names=None):
+    """``(frames, meta)`` of the named snapshot bundle if it exists and matches SNAPSHOT_SCHEMA_VERSION.
+
+    Only ``frame_names`` are read if given.
+    """
+    try:
+        frames, meta = load_frames(name, settings['dir'], frame_names)
+    except Exception:
+        logger.exception("Could not read snapshot '%s'", name)
+        return None, None
+    if frames is None or meta.get('schema_version') != SNAPSHOT_SCHEMA_VERSION:
+        return None, None
+    return frames, meta
+
+
+# Source version last written to disk, so unchanged sources aren't snapshotted again
+_snapshotted_versions = {}
+
+
+def _save_source_snapshot(name, version, df):
+    settings = snapshot_settings()
+    if not settings['enabled'] or _snapshotted_versions.get(name) == version:
+        return
+    try:
+        save_frames(f'source_{name}', {'data': df}, _snapshot_meta(), settings['dir'])
+        _snapshotted_versions[name] = version
+    except Exception:
+        logger.exception("Could not snapshot source '%s'", name)
+
+
+def _source_fallback(name):
+    """``(version, frame)`` from the source's last snapshot, or an empty frame if there is no usable one."""
+    settings = snapshot_settings()
+    if settings['enabled']:
+        frames, meta = load_valid_snapshot(f'source_{name}', settings)
+        if frames is not None:
+            st.warning(f"Using the stored snapshot of '{name}' from {time.ctime(meta['created_at'])}.")
+            return ('snapshot', meta['version']), frames['data']
+    return ('empty',), SOURCE_EMPTY_RESULTS.get(name, pd.DataFrame)()
+
 
+def load_sources_sequentially(names=SOURCE_NAMES):
+    """Load the ``names`` sources one after another, in the order finalize_data used to."""
+    cache = get_source_cache()
+    results = {}
+    for name in names:
+        try:
+            results[name] = cache.get_versioned(name)
+        except Exception as e:
+            st.error(f"An error occurred while loading '{name}': {e}")
+            results[name] = _source_fallback(name)
+            continue
+        _save_source_snapshot(name, *results[name])
+    return results
+
+
+def load_sources_concurrently(names=SOURCE_NAMES, max_workers=None, timeouts=None):
+    """Load the ``names`` sources on a bounded thread pool.
+
+    Each fetch opens its own connection, so the MySQL queries and the Sheets downloads
+    overlap and cold-load time approaches that of the slowest source. A source that
+    fails or runs past its timeout is reported and replaced by its last snapshot (or an
+    empty result) instead of holding up the others.
+    """
+    loader_secrets = st.secrets.get("loader", {})
+    if max_workers is None:
+        max_workers = int(loader_secrets.get("max_workers", len(names)))
+    timeouts = {**SOURCE_TIMEOUTS, **loader_secrets.get("timeouts", {}), **(timeouts or {})}
+    cache = get_source_cache()
+
+    # Worker threads need the script run context to use st.cache_* and st.error
+    ctx = get_script_run_ctx()
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers,
+        thread_name_prefix='source-loader',
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+    )
+    try:
+        started = time.monotonic()
+        futures = {name: executor.submit(cache.get_versioned, name) for name in names}
+        results = {}
+        for name, future in futures.items():
+            # Timeouts count from submission, not from when we get round to waiting on the source
+            remaining = max(0.0, started + timeouts[name] - time.monotonic())
+            try:
+                results[name] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                st.warning(f"Loading '{name}' took longer than {timeouts[name]}s and was skipped.")
+                results[name] = _source_fallback(name)
+                continue
+            except Exception as e:
+                st.error(f"An error occurred while loading '{name}': {e}")
+                results[name] = _source_fallback(name)
+                continue
+            _save_source_snapshot(name, *results[name])
+        return results
+    finally:
+        # Don't wait on sources that timed out; their threads finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def load_sources(names=SOURCE_NAMES):
+    """Load the ``names`` sources as ``(version, frame)`` pairs, concurrently unless disabled
+    with ``concurrent = false`` under [loader]."""
+    names = [name for name in SOURCE_NAMES if name in names]
+    if st.secrets.get("loader", {}).get("concurrent", True):
+        return load_sources_concurrently(names)
+    return load_sources_sequentially(names)
+
+
+# The low-cardinality columns every page groups and filters on are stored as categoricals.
+# Pages must group with observed=True so categories absent from a filtered frame don't show up.
+def categorize_dimensions(df):
+    for column in DIMENSION_COLUMNS:
+        if column in df.columns:
+            df[column] = to_category(df[column])
+    return df
+
+
+# One learner id per normalized email, shared by every frame built in this process
+@st.cache_resource
+def get_learner_index():
+    return LearnerIndex()
+
+
+def with_learner_ids(df):
+    """``df`` with an int32 ``learner_id`` column for its ``email`` column."""
+    if 'email' not in df.columns:
+        return df
+    return df.assign(learner_id=get_learner_index().ids(df['email']))
+
+
+def build_sap_index(df_sap):
+    """Lookup index over the SAP rows by learner id; duplicated SAP emails keep their first row."""
+    return LookupIndex(with_learner_ids(df_sap))
+
+
+def build_merged(df_discovery_al, df_capture_sheet1, sap_index):
     # Pastikan 'gender' tetap ada saat menggabungkan df_discovery_al dan df_capture_sheet1
-    df_capture_sheet1['gender'] = None  # Menambahkan kolom gender ke df_capture_sheet1 dengan nilai default None
+    df_capture_sheet1 = df_capture_sheet1.assign(gender=None)  # Menambahkan kolom gender ke df_capture_sheet1 dengan nilai default None
     df_combined_al_capture = pd.concat([df_discovery_al, df_capture_sheet1], ignore_index=True)
 
     # Drop 'nik' column if it exists
     if 'nik' in df_combined_al_capture.columns:
         df_combined_al_capture = df_combined_al_capture.drop(columns=['nik'])
 
-    # Merge with SAP to determine status_learner
-    df_merged = pd.merge(df_combined_al_capture, df_sap, on='email', how='left', indicator=True)
-    df_merged['status_learner'] = df_merged['_merge'].apply(lambda x: 'Internal' if x == 'both' else 'External')
-    df_merged.drop(columns=['_merge'], inplace=True)
+    # Lengkapi dengan atribut SAP; learner yang ada di SAP adalah Internal.
+    # Kolom yang sudah ada (gender) hanya diisi dari SAP jika kosong.
+    if sap_index.duplicates:
+        message = (f"{len(sap_index.duplicates)} emails appear more than once in SAP; only their first row is used: "
+                   f"{', '.join(sap_index.duplicates[:10])}{' ...' if len(sap_index.duplicates) > 10 else ''}")
+        logger.warning(message)
+        st.warning(message)
+    df_merged, matched = sap_index.enrich(with_learner_ids(df_combined_al_capture))
+    df_merged['status_learner'] = pd.Categorical(np.where(matched, 'Internal', 'External'), categories=['External', 'Internal'])
 
-    # Convert 'last_updated' to date
-    if 'last_updated' in df_merged.columns:
-        df_merged['last_updated'] = pd.to_datetime(df_merged['last_updated'], errors='coerce').dt.date
+    # Normalisasi nilai gender menjadi 'Female', 'Male', atau 'n/a'
+    df_merged['gender'] = normalize_gender(df_merged['gender'])
 
-    # Pastikan tidak ada duplikasi kolom gender
-    if 'gender_x' in df_merged.columns and 'gender_y' in df_merged.columns:
-        df_merged['gender'] = df_merged['gender_x'].combine_first(df_merged['gender_y'])
-        df_merged = df_merged.drop(columns=['gender_x', 'gender_y'])
+    # Kolom yang sudah dibersihkan untuk semua halaman
+    df_merged['Company'] = clean_company(df_merged['Company'])
+    df_merged['layer_group'] = layer_group(df_merged['layer'])
 
-    # Normalisasi nilai gender menjadi 'female', 'male', atau 'n/a'
-    def normalize_gender(value):
-        value = str(value).strip().lower()  # Pastikan nilai diubah menjadi string lowercase
-        if value in ['male', 'laki-laki', 'laki - laki', 'pria', 'm']:
-            return 'Male'
-        elif value in ['female', 'perempuan', 'wanita', 'f']:
-            return 'Female'
-        else:
-            return 'n/a'
+    # The Capture rows bring their own types, so the concatenated columns are converted again
+    return categorize_dimensions(apply_schema(df_merged))
 
-    df_merged['gender'] = df_merged['gender'].apply(normalize_gender)
-
-    # Konversi tipe data 'Customer ID' ke string
-    df_merged['Customer ID'] = df_merged['Customer ID'].astype(str)
-    df_merged = fill_empty_with_na(df_merged)
 
+def build_au_capture(df_discovery_au, df_capture_sheet2):
     # Concatenate Discovery AU and Capture Sheet2 vertically
-    df_combined_au_capture = pd.concat([df_discovery_au, df_capture_sheet2], ignore_index=True)
+    df_combined_au_capture = with_learner_ids(pd.concat([df_discovery_au, df_capture_sheet2], ignore_index=True))
+    return categorize_dimensions(apply_schema(df_combined_au_capture))
+
+
+def build_capture_sheet3(df_capture_sheet3):
+    return apply_schema(with_learner_ids(df_capture_sheet3))
+
+
+# One test attempt; its rows are the scores of the attempt's traits
+ATTEMPT_KEYS = ['platform', 'title', 'email', 'last_updated', 'Test Name']
+
+
+def best_score_per_attempt(df):
+    """The highest-scoring row of every attempt (ATTEMPT_KEYS), ordered by email, date and test.
+
+    Same rows as ``groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()``
+    within one platform and title: ties keep the first row, and rows without a score or
+    a key are left out.
+    """
+    scored = df.dropna(subset=ATTEMPT_KEYS + ['total_score'])
+    best = scored.sort_values('total_score', ascending=False, kind='stable').drop_duplicates(ATTEMPT_KEYS)
+    return best.sort_values(['email', 'last_updated', 'Test Name'], kind='stable')
+
+
+def latest_result_per_test(df):
+    """The latest row of every learner and test, like ``groupby(['email', 'Test Name'])['last_updated'].idxmax()``."""
+    keys = ['email', 'Test Name']
+    dated = df.dropna(subset=keys + ['last_updated'])
+    latest = dated.sort_values('last_updated', ascending=False, kind='stable').drop_duplicates(keys)
+    return latest.sort_values(keys, kind='stable')
+
+
+def rows_in(table, rows):
+    """The rows of a DERIVED_TABLES ``table`` that come from ``rows``, a filtered view of its dataset.
+
+    The reductions are made over the whole dataset, so this equals reducing ``rows`` only
+    as long as the filters keep or drop whole groups. Per-learner attributes (unit, layer,
+    status, ...) always do. An attempt has a single platform, title and date, so
+    best_scores also allows those filters. A learner's test in latest_results spans
+    several dates: if a date filter drops its latest row, the test is left out instead
+    of falling back to its latest row in the range, so latest_results must not be
+    combined with date-filtered rows.
+    """
+    return table[table.index.isin(rows.index)]
+
+
+# Index name -> (source it is built from, build function); datasets can depend on these like on sources
+LOOKUP_INDEXES = {
+    'sap_index': ('sap', build_sap_index),
+}
 
-    # Convert 'created_at' to date
-    if 'created_at' in df_combined_au_capture.columns:
-        df_combined_au_capture['created_at'] = pd.to_datetime(df_combined_au_capture['created_at'], errors='coerce').dt.date
+# Dataset name -> (sources it is built from, build function called with those sources' frames)
+DATASETS = {
+    'discovery': (['discovery'], with_learner_ids),
+    'sap': (['sap'], with_learner_ids),
+    'merged': (['discovery_al', 'capture_sheet1', 'sap_index'], build_merged),
+    'au_capture': (['discovery_au', 'capture_sheet2'], build_au_capture),
+    'capture_sheet3': (['capture_sheet3'], build_capture_sheet3),
+}
 
-    df_combined_au_capture = fill_empty_with_na(df_combined_au_capture)
 
-    # Convert dates in Capture Sheet3
-    if 'scheduled_at' in df_capture_sheet3.columns:
-        df_capture_sheet3['scheduled_at'] = pd.to_datetime(df_capture_sheet3['scheduled_at'], errors='coerce').dt.date
-    if 'done_at' in df_capture_sheet3.columns:
-        df_capture_sheet3['done_at'] = pd.to_datetime(df_capture_sheet3['done_at'], errors='coerce').dt.date
+def build_datasets(names):
+    """Load just the sources the ``names`` datasets depend on and build those datasets.
 
-    df_capture_sheet3 = fill_empty_with_na(df_capture_sheet3)
+    Derived frames are only rebuilt when one of the sources they are built from changed.
+    """
+    inputs = {source for name in names for source in DATASETS[name][0]}
+    sources = load_sources({LOOKUP_INDEXES[source][0] if source in LOOKUP_INDEXES else source for source in inputs})
+    cache = get_source_cache()
+    # An index is rebuilt only when its source changed, and has that source's version
+    for index_name in inputs & set(LOOKUP_INDEXES):
+        source, build = LOOKUP_INDEXES[index_name]
+        sources[index_name] = (sources[source][0], cache.derive(index_name, [sources[source]], build))
+    frames = {}
+    for name in names:
+        source_names, build = DATASETS[name]
+        frames[name] = cache.derive(name, [sources[source] for source in source_names], build)
+    return frames
 
-    return df_discovery, df_sap, df_merged, df_combined_au_capture, df_capture_sheet3
+
+def build_finalized_frames():
+    """Load every source and build the finalized frames, keyed by FINALIZED_FRAMES name."""
+    return build_datasets(FINALIZED_FRAMES)
+
+
+def save_finalized_snapshot(frames, settings):
+    """Store ``frames`` as the new finalized snapshot and return its version.
+
+    Callers check the frames with validate_datasets first.
+    """
+    meta = {**_snapshot_meta(), 'rows': {name: len(df) for name, df in frames.items()}, 'sources': source_fingerprints()}
+    # The learner table goes along so the ids can be translated when another process loads it
+    return save_frames('finalized', {**frames, 'learners': get_learner_index().table()}, meta, settings['dir'])
+
+
+def source_fingerprints():
+    """Fingerprints of the sources the finalized frames were built from, as stored in the snapshot
+    metadata, or None if a source fell back to its snapshot or an empty frame."""
+    cache = get_source_cache()
+    versions = [version for name in FINALIZED_FRAMES for version in cache.derived_versions(name) or [None]]
+    if not all(isinstance(version, int) for version in versions):
+        return None
+    return json.loads(json.dumps(cache.fingerprints(), default=str))
+
+
+def published_meta(settings):
+    """Metadata of the current finalized snapshot, or None if there is no valid one."""
+    try:
+        meta = load_frames_meta('finalized', settings['dir'])
+    except Exception:
+        logger.exception("Could not read the finalized snapshot's metadata")
+        return None
+    if meta is None or meta.get('schema_version') != SNAPSHOT_SCHEMA_VERSION:
+        return None
+    return meta
+
+
+def published_rows(settings):
+    """Row counts of the frames in the current finalized snapshot, by name ({} if there is none)."""
+    meta = published_meta(settings)
+    return meta.get('rows', {}) if meta is not None else {}
+
+
+def load_finalized_snapshot(settings, names=FINALIZED_FRAMES):
+    """``(frames, meta)`` of the ``names`` frames of the finalized snapshot, with their learner ids
+    translated to this process's index. The other frames aren't read."""
+    frames, meta = load_valid_snapshot('finalized', settings, list(names) + ['learners'])
+    if frames is None:
+        return None, None
+    learners = frames.pop('learners')
+    index = get_learner_index()
+    for name, df in frames.items():
+        if 'learner_id' in df.columns:
+            df['learner_id'] = index.remap(df['learner_id'], learners)
+    return frames, meta
+
+
+def refresh_finalized_snapshot():
+    """Rebuild the finalized frames and store them as the latest snapshot."""
+    frames = build_finalized_frames()
+    settings = snapshot_settings()
+    if settings['enabled']:
+        validate_datasets(frames, published_rows(settings))
+        save_finalized_snapshot(frames, settings)
+    return frames
+
+
+_background_refresh_lock = threading.Lock()
+
+
+def refresh_in_background():
+    """Refresh the finalized snapshot on a daemon thread unless a refresh is already running.
+
+    Sessions keep being served from the current snapshot meanwhile; once the new one is
+    written, the held datasets are re-checked so the next rerun picks it up.
+    """
+    if not _background_refresh_lock.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            get_source_cache().revalidate()
+            refresh_finalized_snapshot()
+            get_dataset_holder().invalidate()
+        except Exception:
+            logger.exception('Background refresh of the finalized snapshot failed')
+        finally:
+            _background_refresh_lock.release()
+
+    threading.Thread(target=run, name='snapshot-refresh', daemon=True).start()
+    return True
+
+
+def load_dataset(name, held_version):
+    """``(version, frame)`` of the current ``name`` dataset, or None if ``held_version`` is still current.
+
+    Versions are ``('snapshot', <snapshot version>)`` when served from the finalized
+    snapshot and ``('build', <input versions>)`` when built in this process.
+    """
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset '{name}', expected one of {list(DATASETS)}")
+    settings = snapshot_settings()
+    if data_service_enabled():
+        return attach_published_dataset(name, held_version, settings)
+    if settings['enabled']:
+        try:
+            meta = load_frames_meta('finalized', settings['dir'])
+        except Exception:
+            logger.exception("Could not read the finalized snapshot's metadata")
+            meta = None
+        if meta is not None and meta.get('schema_version') == SNAPSHOT_SCHEMA_VERSION:
+            # Serve the latest valid snapshot straight away, refreshing it behind the scenes once expired
+            if time.time() - meta['created_at'] > settings['ttl_seconds'] and not refresh_settings()['enabled']:
+                refresh_in_background()
+            version = ('snapshot', meta['version'])
+            if version == held_version:
+                return None
+            frames, meta = load_finalized_snapshot(settings, [name])
+            if frames is not None:
+                return ('snapshot', meta['version']), frames[name]
+        # The snapshot holds every dataset, so the first one is built in full
+        frames = build_finalized_frames()
+        try:
+            validate_datasets(frames, published_rows(settings))
+        except ValueError:
+            # Served from this build, but not published for the other workers
+            logger.exception('The finalized snapshot was not saved')
+            return ('build', get_source_cache().derived_versions(name)), frames[name]
+        return ('snapshot', save_finalized_snapshot(frames, settings)), frames[name]
+    frame = build_datasets([name])[name]
+    version = ('build', get_source_cache().derived_versions(name))
+    return None if version == held_version else (version, frame)
+
+
+def data_service_enabled():
+    """Whether datasets come from a separate data_service.py process (``enabled`` under [data_service])."""
+    return st.secrets.get("data_service", {}).get("enabled", False)
+
+
+def attach_published_dataset(name, held_version, settings):
+    """Like load_dataset, but only reading what data_service.py published; nothing is built here."""
+    try:
+        meta = load_frames_meta('finalized', settings['dir'])
+    except Exception:
+        logger.exception("Could not read the finalized snapshot's metadata")
+        meta = None
+    frames = None
+    if meta is not None and meta.get('schema_version') == SNAPSHOT_SCHEMA_VERSION:
+        if ('snapshot', meta['version']) == held_version:
+            return None
+        frames, meta = load_finalized_snapshot(settings, [name])
+    if frames is not None:
+        return ('snapshot', meta['version']), frames[name]
+    if held_version is not None:
+        # Keep serving the version already attached
+        return None
+    st.error("The data service hasn't published the dashboard data yet. Please try again in a few minutes.")
+    st.stop()
+
+
+# Date column the date pickers filter each dataset on
+DATE_COLUMNS = {
+    'merged': 'last_updated',
+    'au_capture': 'created_at',
+}
+
+
+# Columns the sidebar filters of each dataset select on
+FILTER_COLUMNS = {
+    'merged': ['platform', 'status_learner', 'unit', 'subunit', 'layer', 'layer_group', 'title', 'Company', 'institution', 'tenure'],
+}
+
+# Columns the distinct learner KPIs of each dated dataset are broken down by
+COUNT_GROUPS = {
+    'merged': ['platform', 'status_learner'],
+    'au_capture': ['platform', 'learner_status'],
+}
+
+def approximate_counts():
+    """Whether KPIs count distinct learners from HyperLogLog sketches (``approximate`` under [counts])
+    instead of exactly."""
+    return st.secrets.get("counts", {}).get("approximate", False)
+
+
+# Dataset name -> derived table name -> reduction of the dataset, computed once per version
+DERIVED_TABLES = {
+    'merged': {
+        'best_scores': best_score_per_attempt,
+        'latest_results': latest_result_per_test,
+    },
+}
+
+# Per-version indexes of a dataset; each is None if the dataset has no DATE_COLUMNS / FILTER_COLUMNS / COUNT_GROUPS entry.
+# ``derived`` holds its DERIVED_TABLES
+DatasetIndexes = namedtuple('DatasetIndexes', ['dates', 'filters', 'counts', 'derived'])
+
+
+def prepare_dataset(name, frame):
+    """Per-version extras of a dataset: its DatasetIndexes."""
+    return DatasetIndexes(
+        DateIndex(frame[DATE_COLUMNS[name]]) if name in DATE_COLUMNS else None,
+        FilterIndex(frame, FILTER_COLUMNS[name]) if name in FILTER_COLUMNS else None,
+        (SketchedDistinctCounts if approximate_counts() else DailyDistinctCounts)(
+            frame[DATE_COLUMNS[name]], frame['learner_id'], {column: frame[column] for column in COUNT_GROUPS[name]},
+        ) if name in COUNT_GROUPS else None,
+        {table: reduce(frame) for table, reduce in DERIVED_TABLES.get(name, {}).items()},
+    )
+
+
+def refresh_settings():
+    """Scheduled refresh options from the [refresh] secrets section."""
+    refresh_secrets = st.secrets.get("refresh", {})
+    return {
+        'enabled': refresh_secrets.get("enabled", True),
+        'interval_seconds': float(refresh_secrets.get("interval_minutes", 15)) * 60,
+    }
+
+
+def validate_datasets(frames, served_rows):
+    """Raise ValueError if the rebuilt ``frames`` shouldn't replace the datasets being served.
+
+    ``served_rows`` maps a dataset name to the row count of the version served now
+    (see held_rows and published_rows). Every finalized dataset must be there with its
+    learner ids and date column, and a dataset may only come out empty if the served
+    version is empty too: a source that failed and fell back to an empty frame must not
+    wipe out the last good data.
+    """
+    problems = []
+    cache = get_source_cache()
+    for name in FINALIZED_FRAMES:
+        df = frames.get(name)
+        if df is None:
+            problems.append(f"'{name}' is missing")
+            continue
+        expected = ['learner_id'] + ([DATE_COLUMNS[name]] if name in DATE_COLUMNS else [])
+        missing = [column for column in expected if column not in df.columns]
+        if missing:
+            problems.append(f"'{name}' has no {missing} column")
+        failed_sources = ('empty',) in (cache.derived_versions(name) or ())
+        if (df.empty or failed_sources) and served_rows.get(name, 0) > 0:
+            problems.append(f"'{name}' came out empty or from a failed source")
+    if problems:
+        raise ValueError('Rebuilt datasets rejected: ' + '; '.join(problems))
+
+
+def held_rows(holder):
+    """Row counts of the datasets ``holder`` serves now, by name."""
+    rows = {}
+    for name in FINALIZED_FRAMES:
+        held = holder.current(name)
+        if held is not None:
+            rows[name] = len(held.frame)
+    return rows
+
+
+# Input versions of the last scheduled rebuild, so unchanged datasets aren't swapped or saved again
+_rebuilt_versions = {}
+
+
+def _seed_rebuilt_versions(holder, versions, settings):
+    # Count the published snapshot as the last rebuild if it was built from the sources as they are
+    # now and is what ``holder`` serves, so the first run after a restart doesn't write it again
+    meta = published_meta(settings)
+    fingerprints = source_fingerprints()
+    if meta is None or fingerprints is None or meta.get('sources') != fingerprints:
+        return
+    published = ('snapshot', meta['version'])
+    if all(holder.version(name) in (None, published) for name in FINALIZED_FRAMES):
+        _rebuilt_versions.update(versions)
+
+
+def rebuild_datasets(holder):
+    """Every finalized dataset, rebuilt off the request path, as name -> ``(version, frame)``.
+
+    Called by the RefreshScheduler. The frames are validated before anything is saved or
+    swapped in; nothing is returned if no source changed since the last rebuild. With the
+    data service enabled, the latest published version is attached instead.
+    """
+    settings = snapshot_settings()
+    if data_service_enabled():
+        meta = load_frames_meta('finalized', settings['dir'])
+        version = ('snapshot', meta['version']) if meta is not None else None
+        if version is None or all(holder.version(name) == version for name in FINALIZED_FRAMES):
+            return {}
+        frames, meta = load_finalized_snapshot(settings)
+        if frames is None:
+            raise ValueError('The published finalized snapshot could not be read')
+        validate_datasets(frames, held_rows(holder))
+        return {name: (('snapshot', meta['version']), frame) for name, frame in frames.items()}
+    cache = get_source_cache()
+    cache.revalidate()
+    frames = build_finalized_frames()
+    versions = {name: cache.derived_versions(name) for name in FINALIZED_FRAMES}
+    if not _rebuilt_versions and settings['enabled']:
+        _seed_rebuilt_versions(holder, versions, settings)
+    if versions == _rebuilt_versions:
+        # Datasets not held yet are loaded from the published snapshot on first use
+        return {}
+    validate_datasets(frames, held_rows(holder))
+    if settings['enabled']:
+        version = ('snapshot', save_finalized_snapshot(frames, settings))
+        datasets = {name: (version, frames[name]) for name in FINALIZED_FRAMES}
+    else:
+        datasets = {name: (('build', versions[name]), frames[name]) for name in FINALIZED_FRAMES}
+    _rebuilt_versions.clear()
+    _rebuilt_versions.update(versions)
+    return datasets
+
+
+# Datasets shared by every session; pages read views of them instead of unpickled copies
+@st.cache_resource
+def get_dataset_holder():
+    refresh = refresh_settings()
+    if not refresh['enabled']:
+        return DatasetHolder(load_dataset, prepare_dataset, check_seconds=SNAPSHOT_CHECK_SECONDS)
+    # Held datasets are only loaded on first use; the scheduler swaps in every later version
+    holder = DatasetHolder(load_dataset, prepare_dataset, check_seconds=None)
+    RefreshScheduler(holder, partial(rebuild_datasets, holder), refresh['interval_seconds']).start()
+    return holder
+
+
+def get_dataset(name):
+    """The ``name`` dataset (see DATASETS), reading or building only what it needs.
+
+    The frame is shared with every other session; pages get a view of it once the app
+    entry point has enabled copy-on-write (see DatasetHolder.get), so changing it copies
+    only what is changed.
+    """
+    return get_dataset_holder().get(name)[0]
+
+
+def get_indexed_dataset(name):
+    """``(frame, DatasetIndexes)`` for the ``name`` dataset, with its indexes and derived tables."""
+    return get_dataset_holder().get(name)
+
+
+def finalize_data():
+    """All finalized frames, in FINALIZED_FRAMES order; pages should ask get_dataset for the ones they use."""
+    return tuple(get_dataset(name) for name in FINALIZED_FRAMES)
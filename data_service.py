@@ -0,0 +1,74 @@
+"""Standalone data service: loads and finalizes the datasets once for every dashboard worker.
+
+Run it next to the Streamlit replicas with the same secrets and a ``[snapshot] dir``
+they all can read (a directory on /dev/shm keeps it in shared memory):
+
+    python data_service.py             # publish every [data_service] interval_seconds
+    python data_service.py --once      # publish one version and exit
+
+Each version is written as Arrow IPC files and published by atomically swapping the
+snapshot's CURRENT pointer, so workers never see a half-written version. Workers with
+``enabled = true`` under [data_service] only attach to what is published and never query
+MySQL or Sheets themselves. Publishing is plain files, so a service and its workers can
+be tried out on one machine against a temporary directory.
+"""
+import argparse
+import logging
+import time
+
+from data_processing import (
+    FINALIZED_FRAMES, build_finalized_frames, get_source_cache, published_rows, save_finalized_snapshot,
+    snapshot_settings, validate_datasets,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 300
+
+
+def publish(last_versions=None):
+    """Build the finalized frames and publish them unless nothing changed since ``last_versions``.
+
+    Returns ``(input versions, published snapshot version or None)``. Raises ValueError,
+    publishing nothing, if validate_datasets rejects the frames.
+    """
+    frames = build_finalized_frames()
+    cache = get_source_cache()
+    versions = {name: cache.derived_versions(name) for name in FINALIZED_FRAMES}
+    if versions == last_versions:
+        return versions, None
+    settings = snapshot_settings()
+    validate_datasets(frames, published_rows(settings))
+    return versions, save_finalized_snapshot(frames, settings)
+
+
+def serve(interval_seconds):
+    """Publish a new version whenever a source changed, checking every ``interval_seconds``."""
+    versions = None
+    while True:
+        started = time.monotonic()
+        try:
+            get_source_cache().revalidate()
+            versions, published = publish(versions)
+            if published:
+                logger.info('Published finalized snapshot %s in %.1fs', published, time.monotonic() - started)
+        except Exception:
+            # Workers keep serving the last published version
+            logger.exception('Publishing the finalized snapshot failed')
+        time.sleep(max(0.0, interval_seconds - (time.monotonic() - started)))
+
+
+if __name__ == '__main__':
+    import streamlit as st
+
+    parser = argparse.ArgumentParser(description='Load and publish the finalized dashboard datasets.')
+    parser.add_argument('--once', action='store_true', help='publish one version and exit')
+    parser.add_argument('--interval', type=float, help='seconds between checks (default: [data_service] interval_seconds)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    if args.once:
+        _, version = publish()
+        print(f'Published finalized snapshot {version}')
+    else:
+        serve(args.interval or float(st.secrets.get("data_service", {}).get("interval_seconds", DEFAULT_INTERVAL_SECONDS)))
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def copy_on_write_enabled():
+    """Whether pandas copies shared data before a frame changes it (always the case from pandas 3)."""
+    return int(pd.__version__.split('.')[0]) >= 3 or pd.get_option('mode.copy_on_write') is True
+
+
+# A held dataset; ``version`` identifies its content (e.g. the snapshot version it was read from)
+HeldDataset = namedtuple('HeldDataset', ['version', 'frame', 'extras', 'checked_at'])
+
+
+class DatasetHolder:
+    """Latest version of each dataset, shared read-only by every session of the process.
+
+    ``load(name, version)`` returns ``(version, frame)``, or None if the held
+    ``version`` is still current; it is called at most every ``check_seconds`` per
+    dataset, or only for datasets not held yet if ``check_seconds`` is None (when a
+    RefreshScheduler keeps them current). ``prepare(name, frame)`` builds per-version
+    extras (such as date indexes) once, when a new version is stored. Unlike
+    st.cache_data, nothing is pickled or hashed per call, and with pandas copy-on-write
+    enabled (the app entry point turns it on) nothing is copied either: ``get`` hands
+    out a shallow view of the held frame.
+
+    The held datasets are an immutable mapping that is replaced, never changed, so a
+    reader always sees complete versions.
+    """
+
+    def __init__(self, load, prepare=None, check_seconds=600):
+        self._load = load
+        self._prepare = prepare or (lambda name, frame: None)
+        self._check_seconds = check_seconds
+        self._held = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _lock_for(self, name):
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        """``(frame, extras)`` of the current version of ``name``.
+
+        The frame is a shallow view if copy-on-write is enabled, so changing it copies only
+        what is changed; otherwise it's a full copy, as a view would let a caller change
+        the held frame in place.
+        """
+        held = self.held(name)
+        return held.frame.copy(deep=not copy_on_write_enabled()), held.extras
+
+    def held(self, name):
+        """The HeldDataset for ``name``, loading or re-checking it first if it is due."""
+        started = time.perf_counter()
+        held = self._held.get(name)
+        if self._due(held):
+            with self._lock_for(name):
+                held = self._held.get(name)
+                if self._due(held):
+                    held = self._refresh(name, held)
+                    self._record(name, 'load', time.perf_counter() - started)
+                    return held
+        self._record(name, 'hit', time.perf_counter() - started)
+        return held
+
+    def _due(self, held):
+        if held is None:
+            return True
+        if self._check_seconds is None:
+            return held.checked_at == float('-inf')
+        return time.time() - held.checked_at >= self._check_seconds
+
+    def _refresh(self, name, held):
+        loaded = self._load(name, held.version if held is not None else None)
+        if loaded is None:
+            held = held._replace(checked_at=time.time())
+        else:
+            version, frame = loaded
+            held = HeldDataset(version, frame, self._prepare(name, frame), time.time())
+        self._store({name: held})
+        return held
+
+    def _store(self, entries):
+        # Copy, update and swap in the mapping in one reference assignment
+        with self._lock:
+            self._held = {**self._held, **entries}
+
+    def swap(self, datasets):
+        """Replace the held datasets with ``datasets`` (name -> ``(version, frame)``) in one step.
+
+        Everything, including the extras, is prepared before the swap, so readers move from
+        the complete old versions to the complete new ones with nothing in between.
+        """
+        now = time.time()
+        self._store({
+            name: HeldDataset(version, frame, self._prepare(name, frame), now)
+            for name, (version, frame) in datasets.items()
+        })
+
+    def current(self, name):
+        """The HeldDataset for ``name`` as it is now, or None; never loads anything."""
+        return self._held.get(name)
+
+    def version(self, name):
+        """Version token of the held ``name`` dataset, or None if it hasn't been loaded."""
+        held = self._held.get(name)
+        return held.version if held is not None else None
+
+    def invalidate(self, name=None):
+        """Re-check the named dataset (or every dataset) on its next use."""
+        for dataset in [name] if name is not None else list(self._held):
+            with self._lock_for(dataset):
+                held = self._held.get(dataset)
+                if held is not None:
+                    self._store({dataset: held._replace(checked_at=float('-inf'))})
+
+    def _record(self, name, kind, seconds):
+        with self._lock:
+            stats = self._stats.setdefault(name, {'hit': 0, 'hit_seconds': 0.0, 'load': 0, 'load_seconds': 0.0})
+            stats[kind] += 1
+            stats[f'{kind}_seconds'] += seconds
+
+    def stats(self):
+        """Per dataset: number of hits and loads and the seconds spent serving each."""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+class RefreshScheduler:
+    """Daemon thread rebuilding every dataset on a fixed cadence and swapping them into a holder.
+
+    ``rebuild()`` returns name -> ``(version, frame)`` for a complete new set of datasets
+    and raises if they fail validation. Readers keep using the current set meanwhile; a
+    failed rebuild is logged and the last good set stays in place.
+    """
+
+    def __init__(self, holder, rebuild, interval_seconds):
+        self._holder = holder
+        self._rebuild = rebuild
+        self._interval_seconds = interval_seconds
+        self._thread = None
+        self._lock = threading.Lock()
+        self.last_success_at = None
+        self.last_error = None
+        self.failures = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='dataset-refresh', daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self._interval_seconds)
+            self.run_once()
+
+    def run_once(self):
+        """Rebuild and swap once; returns whether the new datasets were swapped in."""
+        started = time.monotonic()
+        try:
+            datasets = self._rebuild()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = repr(e)
+            logger.exception('Dataset refresh failed, keeping the current datasets')
+            return False
+        self._holder.swap(datasets)
+        self.last_success_at = time.time()
+        self.last_error = None
+        logger.info('Refreshed %d datasets in %.1fs', len(datasets), time.monotonic() - started)
+        return True
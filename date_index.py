@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+
+class DateIndex:
+    """Row positions of a frame ordered by one datetime64 column.
+
+    Built once per frame, so a date range is found with two binary searches over the
+    sorted dates instead of comparing every row. Rows without a date are left out, as
+    they are by a ``>=``/``<=`` filter.
+    """
+
+    def __init__(self, dates):
+        values = dates.to_numpy(dtype='datetime64[ns]')
+        dated = np.flatnonzero(~np.isnat(values))
+        self.positions = dated[np.argsort(values[dated], kind='stable')]
+        self.sorted_dates = values[self.positions]
+        self.size = len(values)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def min(self):
+        return pd.Timestamp(self.sorted_dates[0]) if len(self) else pd.NaT
+
+    def max(self):
+        return pd.Timestamp(self.sorted_dates[-1]) if len(self) else pd.NaT
+
+    def positions_between(self, start, end):
+        """Positions, in frame order, of the rows dated from ``start`` to ``end`` (both inclusive)."""
+        first = np.searchsorted(self.sorted_dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        last = np.searchsorted(self.sorted_dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right')
+        return np.sort(self.positions[first:last])
+
+    def between(self, df, start, end):
+        """The rows of ``df`` (the frame the index was built from) dated from ``start`` to ``end``."""
+        if len(df) != self.size:
+            raise ValueError(f'DateIndex was built for {self.size} rows, got a frame of {len(df)}')
+        return df.iloc[self.positions_between(start, end)]
@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from sshtunnel import SSHTunnelForwarder
+
+
+class ConnectionPool:
+    """A small thread-safe pool of reusable DB-API connections.
+
+    ``connect`` is a zero-argument callable returning a new connection. Idle connections
+    are handed out most-recently-used first; a connection is replaced instead of reused
+    once it is older than ``recycle_seconds``, and is pinged before reuse if it has been
+    idle for longer than ``health_check_seconds``.
+    """
+
+    def __init__(self, connect, max_size=5, recycle_seconds=1800, health_check_seconds=30):
+        self._connect = connect
+        self._max_size = max_size
+        self._recycle_seconds = recycle_seconds
+        self._health_check_seconds = health_check_seconds
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = queue.LifoQueue()  # (connection, created_at, last_used_at)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out for the duration of the ``with`` block.
+
+        The connection goes back to the pool if the block succeeds and is closed if it
+        raises, since it may be left mid-result or broken.
+        """
+        self._slots.acquire()
+        try:
+            conn, created_at, generation = self._checkout()
+            try:
+                yield conn
+            except BaseException:
+                _close_quietly(conn)
+                raise
+            self._checkin(conn, created_at, generation)
+        finally:
+            self._slots.release()
+
+    def recycle(self):
+        """Close every idle connection and retire the ones currently checked out."""
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                conn, _, _, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            _close_quietly(conn)
+
+    def _checkout(self):
+        now = time.monotonic()
+        while True:
+            try:
+                conn, created_at, last_used_at, generation = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation or now - created_at > self._recycle_seconds:
+                _close_quietly(conn)
+                continue
+            if now - last_used_at > self._health_check_seconds and not _is_healthy(conn):
+                _close_quietly(conn)
+                continue
+            return conn, created_at, generation
+        return self._connect(), now, self._generation
+
+    def _checkin(self, conn, created_at, generation):
+        if generation != self._generation or self._idle.qsize() >= self._max_size:
+            _close_quietly(conn)
+            return
+        self._idle.put((conn, created_at, time.monotonic(), generation))
+
+
+class SSHTunnel:
+    """A long-lived SSH tunnel to the database host with keepalive.
+
+    The tunnel is opened lazily and restarted whenever it is found to be down, so
+    callers should ask for ``local_address()`` each time they open a connection.
+    """
+
+    def __init__(self, ssh_address, ssh_username, remote_address, ssh_pkey=None, ssh_password=None, keepalive_seconds=30):
+        self._ssh_address = ssh_address
+        self._ssh_username = ssh_username
+        self._remote_address = remote_address
+        self._ssh_pkey = ssh_pkey
+        self._ssh_password = ssh_password
+        self._keepalive_seconds = keepalive_seconds
+        self._forwarder = None
+        self._lock = threading.Lock()
+
+    def local_address(self):
+        """Return the local (host, port) the tunnel listens on, (re)starting it if needed."""
+        with self._lock:
+            if self._forwarder is None or not self._is_up():
+                self._restart()
+            return '127.0.0.1', self._forwarder.local_bind_port
+
+    def close(self):
+        with self._lock:
+            if self._forwarder is not None:
+                self._forwarder.stop()
+                self._forwarder = None
+
+    def _is_up(self):
+        if not self._forwarder.is_active:
+            return False
+        self._forwarder.check_tunnels()
+        return all(self._forwarder.tunnel_is_up.values())
+
+    def _restart(self):
+        if self._forwarder is not None:
+            self._forwarder.stop()
+        self._forwarder = SSHTunnelForwarder(
+            self._ssh_address,
+            ssh_username=self._ssh_username,
+            ssh_pkey=self._ssh_pkey,
+            ssh_password=self._ssh_password,
+            remote_bind_address=self._remote_address,
+            local_bind_address=('127.0.0.1', 0),
+            set_keepalive=self._keepalive_seconds,
+        )
+        self._forwarder.start()
+
+
+def _is_healthy(conn):
+    try:
+        conn.ping(reconnect=False)
+        return True
+    except Exception:
+        return False
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
@@ -0,0 +1,185 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class DailyDistinctCounts:
+    """Exact number of distinct keys (learners) among the rows dated in a range, per group of rows.
+
+    For a group (e.g. one platform and status) the rows are reduced to one entry per key
+    and date, each remembering the previous date the same key appeared on. A key is
+    counted in a range exactly once, on its first date inside it: the entries dated in the
+    range whose previous date falls before it. A cumulative table over (date, previous
+    date) answers that with two lookups, so a date range costs the same as a single day.
+
+    Tables are built on first use per combination of group values and kept for the
+    frame's lifetime. A group spanning more than ``max_dates`` distinct dates (the table
+    grows with their square) is counted directly from the rows instead.
+    """
+
+    def __init__(self, dates, keys, groups, max_dates=2000):
+        self._dates = dates.to_numpy(dtype='datetime64[ns]')
+        self._keys = pd.factorize(keys)[0]
+        self._groups = {}
+        for column, values in groups.items():
+            codes, uniques = pd.factorize(values, use_na_sentinel=True)
+            self._groups[column] = (codes, {value: code for code, value in enumerate(uniques)})
+        self._max_dates = max_dates
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _rows(self, selected):
+        rows = ~np.isnat(self._dates)
+        for column, value in selected:
+            codes, lookup = self._groups[column]
+            code = lookup.get(value)
+            if code is None:
+                return np.zeros(len(rows), dtype=bool)
+            rows &= codes == code
+        return rows
+
+    def _table(self, selected):
+        with self._lock:
+            if selected not in self._tables:
+                self._tables[selected] = self._build(self._rows(selected))
+            return self._tables[selected]
+
+    def _build(self, rows):
+        dates, day = np.unique(self._dates[rows], return_inverse=True)
+        if len(dates) > self._max_dates:
+            return dates, None
+        size = len(dates)
+        # One entry per (key, date), ordered by key and then date
+        pairs = np.unique(self._keys[rows].astype(np.int64) * size + day)
+        keys, day = np.divmod(pairs, size)
+        # Previous date of the same key, shifted by one so that 0 means "none"
+        previous = np.where(np.r_[False, keys[1:] == keys[:-1]], np.r_[0, day[:-1]] + 1, 0)
+        counts = np.bincount(day * (size + 1) + previous, minlength=size * (size + 1)).reshape(size, size + 1)
+        # cumulative[d, p]: entries dated before date d whose shifted previous date is below p
+        cumulative = np.zeros((size + 1, size + 2), dtype=np.int32)
+        cumulative[1:, 1:] = counts.cumsum(axis=0).cumsum(axis=1)
+        return dates, cumulative
+
+    def count(self, start, end, **selected):
+        """Distinct keys among the rows dated from ``start`` to ``end`` (both inclusive).
+
+        ``selected`` restricts the rows to a value of each named group column (e.g.
+        ``platform='Discovery'``); a value of None doesn't restrict.
+        """
+        selected = tuple(sorted((column, value) for column, value in selected.items() if value is not None))
+        dates, cumulative = self._table(selected)
+        first = np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        last = np.searchsorted(dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right')
+        if last <= first:
+            return 0
+        if cumulative is None:
+            start, end = np.datetime64(pd.Timestamp(start), 'ns'), np.datetime64(pd.Timestamp(end), 'ns')
+            rows = self._rows(selected) & (self._dates >= start) & (self._dates <= end)
+            return len(np.unique(self._keys[rows]))
+        # Entries up to the last date with no earlier entry since the first, minus those before the first date
+        return int(cumulative[last, first + 1] - cumulative[first, -1])
+
+
+class SketchedDistinctCounts:
+    """Approximate number of distinct keys among the rows dated in a range, from HyperLogLog sketches.
+
+    A sketch of ``2 ** precision`` registers merges with another by taking the
+    register-wise maximum, so any range of dates and any union of group values is
+    answered by merging sketches, without touching the rows. The typical error is
+    ``1.04 / sqrt(2 ** precision)`` (1.6% at the default precision). Same interface as
+    DailyDistinctCounts, which gives exact counts.
+
+    Full sketches are only kept per combination of group values and block of days, with
+    the days split into at most ``max_blocks`` blocks, so they take the same memory
+    whatever the date span. Each day keeps just the registers its rows set, which is
+    never more than its rows; the days at the ends of a range that don't fill a block
+    are merged from those.
+    """
+
+    def __init__(self, dates, keys, groups, precision=12, max_blocks=64):
+        values = dates.to_numpy(dtype='datetime64[ns]')
+        dated = ~np.isnat(values)
+        self._dates, day = np.unique(values[dated], return_inverse=True)
+        self._precision = precision
+        # Code 0 of every group column stands for a missing value
+        self._groups = {}
+        codes = []
+        for column, column_values in groups.items():
+            column_codes, uniques = pd.factorize(column_values, use_na_sentinel=True)
+            self._groups[column] = {value: code + 1 for code, value in enumerate(uniques)}
+            codes.append(column_codes[dated] + 1)
+        self._shape = tuple(len(lookup) + 1 for lookup in self._groups.values())
+        combinations = int(np.prod(self._shape))
+        combination = np.ravel_multi_index(codes, self._shape) if codes else np.zeros(dated.sum(), dtype=np.int64)
+
+        # Register of each key: the top ``precision`` bits of its hash; value: the rank of the first set bit after them
+        hashes = pd.util.hash_array(np.asarray(keys)[dated])
+        rest_bits = 64 - precision
+        register = (hashes >> np.uint64(rest_bits)).astype(np.int64)
+        rest = (hashes & np.uint64((1 << rest_bits) - 1)).astype(np.float64)
+        rank = (rest_bits + 1 - np.frexp(rest)[1]).astype(np.uint8)
+
+        # One entry per day, combination and register set, holding its highest rank, ordered by day
+        slot = (day.astype(np.int64) * combinations + combination) << precision | register
+        order = np.lexsort((rank, slot))
+        last = np.r_[slot[order][1:] != slot[order][:-1], True]
+        slot, self._ranks = slot[order][last], rank[order][last]
+        self._registers_set = (slot & ((1 << precision) - 1)).astype(np.int16)
+        day_combination = slot >> precision
+        self._combinations = (day_combination % combinations).astype(np.int32)
+        self._day_starts = np.searchsorted(day_combination // combinations, np.arange(len(self._dates) + 1))
+
+        self._block = max(1, -(-len(self._dates) // max_blocks))
+        self._blocks = np.zeros((combinations, -(-len(self._dates) // self._block), 1 << precision), dtype=np.uint8)
+        block = np.repeat(np.arange(len(self._dates)) // self._block, np.diff(self._day_starts))
+        np.maximum.at(self._blocks, (self._combinations, block, self._registers_set), self._ranks)
+
+    def _merge_days(self, registers, chosen, first, last):
+        # Registers set by the chosen combinations on days first to last (exclusive)
+        entries = slice(self._day_starts[first], self._day_starts[last])
+        kept = chosen[self._combinations[entries]]
+        np.maximum.at(registers, self._registers_set[entries][kept], self._ranks[entries][kept])
+
+    def count(self, start, end, **selected):
+        """Estimated distinct keys among the rows dated from ``start`` to ``end`` (both inclusive).
+
+        ``selected`` restricts the rows to a value, or a list of values, of each named
+        group column; None doesn't restrict.
+        """
+        first = np.searchsorted(self._dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        last = np.searchsorted(self._dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right')
+        chosen = np.ones(self._shape, dtype=bool)
+        for axis, (column, lookup) in enumerate(self._groups.items()):
+            value = selected.get(column)
+            if value is None:
+                continue
+            codes = [0 if pd.isna(item) else lookup.get(item, -1) for item in (value if isinstance(value, list) else [value])]
+            keep = np.zeros(self._shape[axis], dtype=bool)
+            keep[[code for code in codes if code >= 0]] = True
+            chosen &= keep.reshape([-1 if other == axis else 1 for other in range(len(self._shape))])
+        if last <= first or not chosen.any():
+            return 0
+        chosen = chosen.ravel()
+        # Whole blocks inside the range, then the days before and after them
+        first_block, last_block = -(-first // self._block), last // self._block
+        if first_block < last_block:
+            registers = self._blocks[np.flatnonzero(chosen), first_block:last_block].max(axis=(0, 1))
+            self._merge_days(registers, chosen, first, first_block * self._block)
+            self._merge_days(registers, chosen, last_block * self._block, last)
+        else:
+            registers = np.zeros(1 << self._precision, dtype=np.uint8)
+            self._merge_days(registers, chosen, first, last)
+        return estimate(registers)
+
+
+def estimate(registers):
+    """HyperLogLog estimate of the number of distinct keys behind ``registers``."""
+    size = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / size)
+    raw = alpha * size * size / np.ldexp(1.0, -registers.astype(np.int64)).sum()
+    empty = np.count_nonzero(registers == 0)
+    if raw <= 2.5 * size and empty:
+        # Small ranges: linear counting over the empty registers is more accurate
+        raw = size * np.log(size / empty)
+    return int(round(raw))
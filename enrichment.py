@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+
+class LookupIndex:
+    """Index over a reference frame (e.g. SAP) on an integer learner id, for enriching other frames.
+
+    Learner ids are dense, so the index is an array mapping each id straight to its
+    reference row; looking up a whole column is a single vectorized take. Rows whose key
+    is missing (-1) are left out, and only the first row of a duplicated key is kept: a
+    join would repeat every matching learner row once per duplicate.
+    """
+
+    def __init__(self, df, key='learner_id', label='email'):
+        keys = df[key].to_numpy()
+        valid = keys >= 0
+        duplicated = pd.Series(keys).duplicated().to_numpy() & valid
+        # Label of each dropped duplicate (the email), for reporting
+        self.duplicates = sorted(set(df.loc[duplicated, label])) if label in df.columns else []
+        kept = valid & ~duplicated
+        self.table = df.loc[kept].drop(columns=[column for column in (key, label) if column in df.columns]).reset_index(drop=True)
+        self._rows = np.full(int(keys[kept].max()) + 1 if kept.any() else 0, -1, dtype=np.int64)
+        self._rows[keys[kept]] = np.arange(kept.sum())
+
+    def __len__(self):
+        return len(self.table)
+
+    def positions(self, keys):
+        """Reference row of each key in ``keys``, or -1 where it has none."""
+        keys = np.asarray(keys)
+        found = (keys >= 0) & (keys < len(self._rows))
+        return np.where(found, self._rows[np.where(found, keys, 0)] if len(self._rows) else -1, -1)
+
+    def enrich(self, df, key='learner_id'):
+        """``(df with the reference columns attached, matched)``; ``matched`` is a boolean array.
+
+        Columns ``df`` already has keep their values and are only filled from the reference
+        where they are missing, so no ``_x``/``_y`` duplicates are created.
+        """
+        positions = self.positions(df[key].to_numpy())
+        matched = positions >= 0
+        df = df.copy()
+        for column in self.table.columns:
+            values = pd.Series(self.table[column].array.take(positions, allow_fill=True), index=df.index)
+            df[column] = df[column].where(df[column].notna(), values) if column in df.columns else values
+        return df, matched
@@ -7,86 +7,525 @@ from io import StringIO
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import toml
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from db_pool import ConnectionPool, SSHTunnel
+from sheets_reader import LocalSpreadsheet, read_worksheets
+from snapshot_store import DEFAULT_SNAPSHOT_DIR, load_frames, load_snapshot, save_frames, save_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+# Google Sheets sources
+CAPTURE_SPREADSHEET = '0. Data Capture - Monthly Updated'
+SAP_SPREADSHEET = '0. Active Employee - Monthly Updated'
 
 
 # Function to connect to Discovery and fetch data for the main query
-@st.cache_resource
 def fetch_data_discovery():
-    return fetch_data_from_query('query_discovery.sql')
+    return fetch_discovery_query('query_discovery.sql')
 
 
 # Function to connect to Discovery and fetch data for Active Learners
-@st.cache_resource
 def fetch_data_discovery_al():
-    return fetch_data_from_query('query_DiscoveryAL.sql')
+    return fetch_discovery_query('query_DiscoveryAL.sql')
 
 
 # Function to connect to Discovery and fetch data for Active Users
-@st.cache_resource
 def fetch_data_discovery_au():
-    return fetch_data_from_query('query_DiscoveryAU.sql')
+    return fetch_discovery_query('query_DiscoveryAU.sql')
+
+
+# One query over the join shared by query_discovery.sql and query_DiscoveryAL.sql,
+# projecting the union of their columns so both frames can be derived from one result
+DISCOVERY_RESULTS_QUERY = 'query_discovery_results.sql'
+
+
+def fetch_data_discovery_results():
+    return fetch_discovery_query(DISCOVERY_RESULTS_QUERY)
+
+
+def project_discovery(results):
+    """The rows of query_discovery.sql, derived from a DISCOVERY_RESULTS_QUERY result."""
+    if results.empty:
+        return pd.DataFrame()
+    return pd.DataFrame({
+        'email': results['email'],
+        'name': results['name'],
+        'phone': results['phone'],
+        'Register Date': results['register_date'],
+        'Test Date': results['test_date'],
+        'bundle_name': results['bundle_name'],
+        'Test Name': results['test_name'],
+        'typology': results['typology'],
+        'total_score': results['total_score'],
+        'final_result': results['final_result'],
+        'Province': results['province'],
+        'Institution': results['institution'],
+        'Last Education': results['last_education'],
+        'Customer ID': results['customer_id'],
+    })
+
+
+def project_discovery_al(results):
+    """The rows of query_DiscoveryAL.sql, derived from a DISCOVERY_RESULTS_QUERY result."""
+    if results.empty:
+        return pd.DataFrame()
+    return pd.DataFrame({
+        'name': results['name'],
+        'email': results['email'],
+        'nik': '000000',
+        'title': results['bundle_name'],
+        'last_updated': results['test_date'],
+        'duration': 1200,
+        'type': 'Assessment',
+        'platform': 'Discovery',
+        'institution': results['institution'],
+        'Customer ID': results['customer_id'],
+        'last_education': results['last_education'],
+        'date_of_birth': results['date_of_birth'],
+        'company': results['company'],
+        'Company': results['company'],
+        'gender': results['gender'],
+        'Province': results['province'],
+        'Test Name': results['test_name'],
+        'typology': results['typology'],
+        'total_score': results['total_score_prefix'],
+        'final_result': results['final_result'],
+    })
+
+
+def verify_discovery_results():
+    """Check that the single-query path yields the same frames as the two separate queries.
+
+    Rows tied on every ORDER BY key may come back in either order, so frames are
+    compared after sorting on all columns.
+    """
+    def canonical(df):
+        return df.sort_values(list(df.columns), key=lambda column: column.astype(str), kind='mergesort').reset_index(drop=True)
+
+    results = run_query(query_template(DISCOVERY_RESULTS_QUERY))
+    pd.testing.assert_frame_equal(
+        canonical(project_discovery(results)), canonical(run_query(query_template('query_discovery.sql'))))
+    pd.testing.assert_frame_equal(
+        canonical(project_discovery_al(results)), canonical(run_query(query_template('query_DiscoveryAL.sql'))))
+
+
+# Full fetch, or incremental sync when enabled with ``incremental = true`` under [sync].
+# Errors propagate so the caller's source cache can keep serving the last good frame.
+def fetch_discovery_query(query_file):
+    if st.secrets.get("sync", {}).get("incremental", False):
+        return sync_query(query_file)
+    return run_query(query_template(query_file))
+
+
+# Cheap queries whose result changes whenever the matching Discovery query's result is likely to
+RESULTS_FINGERPRINT_QUERY = """
+SELECT
+    (SELECT COUNT(*) FROM user_results) AS user_results,
+    (SELECT COUNT(*) FROM user_bundle_results) AS bundle_results,
+    (SELECT MAX(created_at) FROM user_bundle_results) AS last_bundle_result,
+    (SELECT COUNT(*) FROM customers) AS customers
+"""
+USERS_FINGERPRINT_QUERY = """
+SELECT
+    (SELECT COUNT(*) FROM users) AS users,
+    (SELECT MAX(created_at) FROM users) AS last_user,
+    (SELECT COUNT(*) FROM user_results) AS user_results,
+    (SELECT COUNT(*) FROM user_bundle_result_user_result) AS bundle_result_links
+"""
+DISCOVERY_FINGERPRINT_QUERIES = {
+    'query_discovery.sql': RESULTS_FINGERPRINT_QUERY,
+    'query_DiscoveryAL.sql': RESULTS_FINGERPRINT_QUERY,
+    DISCOVERY_RESULTS_QUERY: RESULTS_FINGERPRINT_QUERY,
+    'query_DiscoveryAU.sql': USERS_FINGERPRINT_QUERY,
+}
+
+
+def discovery_fingerprint(query_file):
+    """Row counts and latest timestamps of the tables behind ``query_file``."""
+    row = run_query(DISCOVERY_FINGERPRINT_QUERIES[query_file], mode=FETCH_MODE_BUFFERED).iloc[0]
+    return tuple(str(value) for value in row)
+
+
+# Shared pool of Discovery connections, optionally routed through a long-lived SSH tunnel
+@st.cache_resource
+def get_connection_pool():
+    discovery_secrets = st.secrets["discovery"]
+    ssh_secrets = st.secrets.get("discovery_ssh")
+
+    tunnel = None
+    if ssh_secrets:
+        ssh_pkey = None
+        if ssh_secrets.get("private_key"):
+            ssh_pkey = paramiko.RSAKey.from_private_key(StringIO(ssh_secrets["private_key"]))
+        tunnel = SSHTunnel(
+            (ssh_secrets["host"], int(ssh_secrets.get("port", 22))),
+            ssh_username=ssh_secrets["user"],
+            remote_address=(discovery_secrets["host"], int(discovery_secrets["port"])),
+            ssh_pkey=ssh_pkey,
+            ssh_password=ssh_secrets.get("password"),
+            keepalive_seconds=float(ssh_secrets.get("keepalive_seconds", 30)),
+        )
+
+    def connect():
+        host, port = tunnel.local_address() if tunnel else (discovery_secrets["host"], discovery_secrets["port"])
+        # autocommit so a pooled connection never reads from a stale REPEATABLE READ snapshot
+        return pymysql.connect(
+            host=host,
+            port=int(port),
+            user=discovery_secrets["user"],
+            password=discovery_secrets["password"],
+            database=discovery_secrets["database"],
+            autocommit=True,
+        )
+
+    return ConnectionPool(
+        connect,
+        max_size=int(discovery_secrets.get("pool_size", 5)),
+        recycle_seconds=float(discovery_secrets.get("pool_recycle_seconds", 1800)),
+        health_check_seconds=float(discovery_secrets.get("pool_health_check_seconds", 30)),
+    )
+
+
+# Extraction modes for fetch_data_from_query
+FETCH_MODE_BUFFERED = 'buffered'    # DictCursor + fetchall, whole result held as dicts
+FETCH_MODE_STREAMING = 'streaming'  # unbuffered tuple cursor, read in fixed-size chunks
+DEFAULT_CHUNK_SIZE = 5000
+
+
+# Marker in the .sql files where optional WHERE predicates are inserted
+FILTERS_MARKER = '/* filters */'
 
 
 # Helper function to fetch data based on SQL file
-def fetch_data_from_query(query_file):
+def fetch_data_from_query(query_file, mode=None, chunk_size=None, **filters):
+    """Run the SQL in ``query_file`` against Discovery and return the result as a DataFrame.
+
+    ``mode`` selects between the buffered and streaming extraction paths and defaults
+    to ``fetch_mode`` in the ``discovery`` secrets section (buffered if unset).
+    ``filters`` (see query_slice) restrict the rows on the server.
+    """
     try:
-        connection_kwargs = {
-            'host': st.secrets["discovery"]["host"],
-            'port': st.secrets["discovery"]["port"],
-            'user': st.secrets["discovery"]["user"],
-            'password': st.secrets["discovery"]["password"],
-            'database': st.secrets["discovery"]["database"],
-            'cursorclass': pymysql.cursors.DictCursor,
-        }
-        conn = pymysql.connect(**connection_kwargs)
-
-        with open(query_file, 'r') as sql_file:
-            query = sql_file.read()
-
-        cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return pd.DataFrame(rows)
+        query, params = query_slice(query_file, **filters)
+        return run_query(query, params, mode=mode, chunk_size=chunk_size)
     except Exception as e:
         st.error(f"An error occurred while fetching data from {query_file}: {e}")
         return pd.DataFrame()
 
 
+def read_query(query_file):
+    with open(query_file, 'r') as sql_file:
+        return sql_file.read()
+
+
+def render_query(query, predicates=()):
+    """Insert ``predicates`` (SQL boolean expressions) at the query's filters marker, ANDed together."""
+    return query.replace(FILTERS_MARKER, ' '.join(f'AND ({predicate})' for predicate in predicates))
+
+
+# Bundle names produced by the CASE in the .sql files -> ubr.bundle_id
+BUNDLE_IDS = {'GI': 1, 'LEAN': 2, 'ELITE': 3, 'Genuine': 4, 'Astaka': 5}
+
+# Query file -> SQL expression each kind of filter is pushed down against
+QUERY_FILTER_COLUMNS = {
+    'query_discovery.sql': {'date': 'ubr.created_at', 'bundle': 'ubr.bundle_id', 'platform': "'Discovery'"},
+    'query_DiscoveryAL.sql': {'date': 'ubr.created_at', 'bundle': 'ubr.bundle_id', 'platform': "'Discovery'"},
+    DISCOVERY_RESULTS_QUERY: {'date': 'ubr.created_at', 'bundle': 'ubr.bundle_id', 'platform': "'Discovery'"},
+    'query_DiscoveryAU.sql': {'date': 'u.created_at', 'bundle': 'ubr.bundle_id', 'platform': "'Discovery'"},
+}
+
+# Query parameter -> (filter column, predicate template)
+FILTER_PREDICATES = {
+    'start': ('date', '{} >= %(start)s'),
+    'end': ('date', '{} < %(end)s'),
+    'bundle_ids': ('bundle', '{} IN %(bundle_ids)s'),
+    'platforms': ('platform', '{} IN %(platforms)s'),
+}
+
+
+def query_slice(query_file, start_date=None, end_date=None, bundles=None, platforms=None):
+    """Return ``(sql, params)`` fetching only the rows of ``query_file`` in the given slice.
+
+    ``start_date``/``end_date`` are inclusive days, ``bundles`` are bundle names ('GI',
+    'LEAN', ...) and ``platforms`` platform names; None means no restriction. Values are
+    bound as query parameters, so the SQL text only depends on which filters are set.
+    """
+    params = {}
+    if start_date is not None:
+        params['start'] = pd.Timestamp(start_date).to_pydatetime()
+    if end_date is not None:
+        params['end'] = (pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)).to_pydatetime()
+    if bundles is not None:
+        # IN () is invalid SQL; IN (NULL) matches nothing
+        params['bundle_ids'] = tuple(BUNDLE_IDS[bundle] for bundle in bundles if bundle in BUNDLE_IDS) or (None,)
+    if platforms is not None:
+        params['platforms'] = tuple(platforms) or (None,)
+    return query_template(query_file, tuple(params)), params or None
+
+
+@lru_cache(maxsize=None)
+def query_template(query_file, param_names=()):
+    """SQL of ``query_file`` with a placeholder predicate per name in ``param_names``.
+
+    pymysql has no server-side prepared statements, so the rendered text is what gets
+    reused: each filter combination is read and rendered once per process.
+    """
+    columns = QUERY_FILTER_COLUMNS[query_file]
+    predicates = []
+    for name in param_names:
+        column, template = FILTER_PREDICATES[name]
+        predicates.append(template.format(columns[column]))
+    return render_query(read_query(query_file), predicates)
+
+
+def run_query(query, params=None, mode=None, chunk_size=None):
+    """Run ``query`` with bound ``params`` on a pooled Discovery connection; errors propagate."""
+    discovery_secrets = st.secrets["discovery"]
+    if mode is None:
+        mode = discovery_secrets.get("fetch_mode", FETCH_MODE_BUFFERED)
+    if chunk_size is None:
+        chunk_size = int(discovery_secrets.get("fetch_chunk_size", DEFAULT_CHUNK_SIZE))
+
+    pool = get_connection_pool()
+    try:
+        return _run_pooled_query(pool, query, params, mode, chunk_size)
+    except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+        # A pooled connection (or the tunnel under it) went stale; start afresh and retry once
+        pool.recycle()
+        return _run_pooled_query(pool, query, params, mode, chunk_size)
+
+
+def _run_pooled_query(pool, query, params, mode, chunk_size):
+    with pool.connection() as conn:
+        if mode == FETCH_MODE_STREAMING:
+            return _stream_query_to_frame(conn, query, params, chunk_size)
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        return pd.DataFrame(rows)
+
+
+def _stream_query_to_frame(conn, query, params, chunk_size):
+    """Read ``query`` through an unbuffered cursor, ``chunk_size`` rows at a time.
+
+    Each chunk is turned into typed column arrays straight away and the raw tuples are
+    dropped, so peak memory is one chunk of tuples plus the column arrays that make up
+    the output frame.
+    """
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(query, params)
+        columns = [description[0] for description in cursor.description]
+        column_parts = [[] for _ in columns]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            del rows
+            for position in range(len(columns)):
+                column_parts[position].append(chunk.iloc[:, position])
+            del chunk
+    finally:
+        cursor.close()
+
+    # Concatenate column by column, releasing each column's chunks as soon as it is built
+    data = {}
+    for position, name in enumerate(columns):
+        parts = column_parts[position]
+        data[name] = pd.concat(parts, ignore_index=True) if parts else pd.Series(dtype=object)
+        column_parts[position] = None
+    return pd.DataFrame(data, columns=columns)
+
+
+# Query file -> (SQL expression, result column) used as the incremental sync watermark.
+# Active Users rows go by their result, so a new result of an existing user is picked up
+SYNC_WATERMARKS = {
+    'query_discovery.sql': ('ubr.created_at', 'Test Date'),
+    'query_DiscoveryAL.sql': ('ubr.created_at', 'last_updated'),
+    DISCOVERY_RESULTS_QUERY: ('ubr.created_at', 'test_date'),
+    'query_DiscoveryAU.sql': ('ur.created_at', 'result_created_at'),
+}
+
+
+def sync_query(query_file):
+    """Bring the local snapshot of ``query_file`` up to date and return it.
+
+    Only rows whose watermark is at or after the stored watermark are fetched; snapshot
+    rows at the watermark itself are replaced by the re-fetched ones, so rows that
+    arrived within the same second are neither lost nor duplicated. Every
+    ``full_refresh_hours`` (and whenever the query changes) the whole result is fetched
+    again to pick up edits to older rows, e.g. an existing user's first test flipping
+    their Active Users rows from Passive to Active.
+    """
+    sync_secrets = st.secrets.get("sync", {})
+    directory = sync_secrets.get("dir", DEFAULT_SNAPSHOT_DIR)
+    full_refresh_seconds = float(sync_secrets.get("full_refresh_hours", 24)) * 3600
+    snapshot_name = 'sync_' + query_file.rsplit('.', 1)[0]
+    watermark_expr, watermark_column = SYNC_WATERMARKS[query_file]
+
+    query = read_query(query_file)
+    snapshot, meta = load_snapshot(snapshot_name, directory)
+    now = time.time()
+    needs_full_sync = (
+        snapshot is None
+        or meta.get('watermark') is None
+        or meta.get('query') != query
+        or now - meta.get('full_synced_at', 0) > full_refresh_seconds
+    )
+
+    try:
+        if needs_full_sync:
+            df = run_query(render_query(query))
+            full_synced_at = now
+        else:
+            watermark = pd.Timestamp(meta['watermark'])
+            new_rows = run_query(
+                render_query(query, [f'{watermark_expr} >= %(watermark)s']),
+                params={'watermark': watermark.to_pydatetime()},
+            )
+            kept = snapshot[~(pd.to_datetime(snapshot[watermark_column]) >= watermark)]
+            df = pd.concat([kept, new_rows], ignore_index=True) if not new_rows.empty else kept
+            full_synced_at = meta['full_synced_at']
+    except Exception as e:
+        if snapshot is None:
+            st.error(f"An error occurred while fetching data from {query_file}: {e}")
+            return pd.DataFrame()
+        st.warning(f"Incremental sync of {query_file} failed, using the last snapshot: {e}")
+        return snapshot
+
+    if df.empty:
+        return df
+    latest = pd.to_datetime(df[watermark_column]).max()
+    save_snapshot(snapshot_name, df, {
+        'query': query,
+        'watermark': None if pd.isna(latest) else latest.isoformat(),
+        'full_synced_at': full_synced_at,
+        'synced_at': now,
+    }, directory)
+    return df
+
+
+# Authorized Google Sheets client shared by the Capture and SAP fetchers
 @st.cache_resource
-def fetch_data_capture():
+def get_sheets_client():
     secret_info = st.secrets["json_sap"]
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     creds = ServiceAccountCredentials.from_json_keyfile_dict(secret_info, scope)
-    client = gspread.authorize(creds)
-    spreadsheet = client.open('0. Data Capture - Monthly Updated')
-    
-    # Ambil data dari sheet1, sheet2, dan sheet3
-    sheet1 = spreadsheet.get_worksheet(0)
-    sheet2 = spreadsheet.get_worksheet(1)
-    sheet3 = spreadsheet.get_worksheet(2)
-   
-    data1 = sheet1.get_all_records()
-    data2 = sheet2.get_all_records()
-    data3 = sheet3.get_all_records()
-    
-    df_capture_sheet1 = pd.DataFrame(data1)
-    df_capture_sheet2 = pd.DataFrame(data2)
-    df_capture_sheet3 = pd.DataFrame(data3)
-    
-    return df_capture_sheet1, df_capture_sheet2, df_capture_sheet3
-
-
-# Function to fetch data from SAP with selected columns
+    return gspread.authorize(creds)
+
+
+# Spreadsheet by title; with ``local_dir`` set under [sheets], a directory of CSV files
+# named after the spreadsheet (one per worksheet) is read instead of Google Sheets
+def get_spreadsheet(title):
+    local_dir = st.secrets.get("sheets", {}).get("local_dir")
+    if local_dir:
+        return LocalSpreadsheet.from_csv_dir(os.path.join(local_dir, title))
+    return open_spreadsheet(title)
+
+
+# Spreadsheet handle, looked up by title once per process
 @st.cache_resource
+def open_spreadsheet(title):
+    return get_sheets_client().open(title)
+
+
+def fetch_data_capture():
+    # Ambil data dari sheet1, sheet2, dan sheet3 dalam satu request
+    requests = [(0, None), (1, None), (2, None)]
+    return tuple(read_unless_unchanged(CAPTURE_SPREADSHEET, 'capture', requests))
+
+
+# Function to fetch data from SAP with selected columns; only those columns are downloaded
 def fetch_data_sap(selected_columns):
-    secret_info = st.secrets["json_sap"]
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(secret_info, scope)
-    client = gspread.authorize(creds)
-    spreadsheet = client.open('0. Active Employee - Monthly Updated')
-    sheet = spreadsheet.sheet1
-    data = sheet.get_all_records()
-    df = pd.DataFrame(data)
-    return df[selected_columns]
+    return read_unless_unchanged(SAP_SPREADSHEET, 'sap', [(0, list(selected_columns))])[0]
+
+
+# Revision checks per spreadsheet title: 'hits' reused the stored copy, 'misses' downloaded it
+_revision_stats = {}
+_revision_stats_lock = threading.Lock()
+
+
+def sheet_revision_stats():
+    """``{title: {'hits': n, 'misses': n}}`` since the process started."""
+    with _revision_stats_lock:
+        return {title: dict(counts) for title, counts in _revision_stats.items()}
+
+
+def _count_revision_check(title, outcome, revision):
+    with _revision_stats_lock:
+        counts = _revision_stats.setdefault(title, Counter({'hits': 0, 'misses': 0}))
+        counts[outcome] += 1
+        hits, misses = counts['hits'], counts['misses']
+    logger.info("Spreadsheet '%s' at revision %s: %s (%d hits, %d misses since start)",
+                title, revision, 'stored copy reused' if outcome == 'hits' else 'downloaded', hits, misses)
+
+
+# Revision each spreadsheet had at its last spreadsheet_revision() check, taken by the fetch that check triggers
+_checked_revisions = {}
+
+
+def _revision_for_fetch(title, spreadsheet):
+    """The revision read by the check that triggered this fetch, or a freshly read one."""
+    with _revision_stats_lock:
+        revision = _checked_revisions.pop(title, None)
+    return revision if revision is not None else spreadsheet.get_lastUpdateTime()
+
+
+def read_unless_unchanged(title, name, requests):
+    """read_worksheets(), reusing the copy stored on disk if the spreadsheet is unchanged.
+
+    The Drive modifiedTime is compared with the revision the stored copy was downloaded
+    at; only if it differs, or the requested worksheets and columns changed, is the
+    spreadsheet downloaded and stored again. The modifiedTime read by the
+    spreadsheet_revision() check that triggered the fetch is reused, so a check costs one
+    metadata request. Disable with ``reuse_unchanged = false`` under [sheets].
+    """
+    sheets_secrets = st.secrets.get("sheets", {})
+    spreadsheet = get_spreadsheet(title)
+    if not sheets_secrets.get("reuse_unchanged", True):
+        return read_worksheets(spreadsheet, requests)
+
+    directory = sheets_secrets.get("dir", DEFAULT_SNAPSHOT_DIR)
+    bundle = 'sheet_' + name
+    revision = _revision_for_fetch(title, spreadsheet)
+    frame_names = [f'worksheet{index}' for index, _ in requests]
+    try:
+        frames, meta = load_frames(bundle, directory)
+    except Exception:
+        frames = meta = None
+    if (frames is not None and meta.get('revision') == revision
+            and meta.get('requests') == [list(request) for request in requests]):
+        _count_revision_check(title, 'hits', revision)
+        return [frames[frame_name] for frame_name in frame_names]
+
+    _count_revision_check(title, 'misses', revision)
+    # The revision is read before downloading, so an edit made meanwhile is picked up next time
+    result = read_worksheets(spreadsheet, requests)
+    save_frames(bundle, dict(zip(frame_names, result)), {
+        'revision': revision,
+        'requests': [list(request) for request in requests],
+        'downloaded_at': time.time(),
+    }, directory)
+    return result
+
+
+def spreadsheet_revision(title):
+    """Drive modifiedTime of a spreadsheet; it changes on every edit to any of its worksheets."""
+    revision = get_spreadsheet(title).get_lastUpdateTime()
+    with _revision_stats_lock:
+        _checked_revisions[title] = revision
+    return revision
+
+
+if __name__ == '__main__':
+    verify_discovery_results()
+    print('Single-query Discovery extraction matches query_discovery.sql and query_DiscoveryAL.sql')
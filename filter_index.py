@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+
+class FilterIndex:
+    """Rows of a frame holding each value of its filterable columns, for combining sidebar filters.
+
+    Built once per frame. Frequent values are kept as packed bitmaps (one bit per row)
+    and rare ones as row positions, whichever is smaller, so columns with thousands of
+    values (companies, institutions) stay cheap. A combination of selections is resolved
+    by OR-ing the bitmaps of the values picked within a column and AND-ing across columns;
+    no rows are copied until the final positions are taken from the frame.
+    """
+
+    def __init__(self, df, columns):
+        self.size = len(df)
+        self._bytes = (self.size + 7) // 8
+        self._values = {}
+        for column in columns:
+            codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes + 1, minlength=len(uniques) + 1)
+            groups = np.split(order, np.cumsum(counts)[:-1])
+            # Group 0 holds the rows without a value; like isin, they match a selected NaN
+            keys = [None] + list(uniques)
+            self._values[column] = {key: self._compact(rows) for key, rows in zip(keys, groups)}
+
+    def _compact(self, rows):
+        return rows.astype(np.int32) if rows.size * 4 < self._bytes else self._bitmap(rows)
+
+    def _bitmap(self, rows):
+        bits = np.zeros(self.size, dtype=bool)
+        bits[rows] = True
+        return np.packbits(bits)
+
+    def _union(self, column, values):
+        entries = self._values[column]
+        packed = np.zeros(self._bytes, dtype=np.uint8)
+        rows = []
+        for value in values:
+            entry = entries.get(None if pd.isna(value) else value)
+            if entry is None:
+                continue
+            if entry.dtype == np.uint8:
+                packed |= entry
+            else:
+                rows.append(entry)
+        if rows:
+            packed |= self._bitmap(np.concatenate(rows))
+        return packed
+
+    def positions(self, selections, within=None):
+        """Positions, in frame order, of the rows matching every selection.
+
+        ``selections`` maps a column to the values to keep; an empty or None selection
+        doesn't filter. ``within`` optionally restricts the result to these positions
+        (e.g. a date range from a DateIndex).
+        """
+        packed = None if within is None else self._bitmap(within)
+        for column, values in selections.items():
+            if values is None or len(values) == 0:
+                continue
+            selected = self._union(column, values)
+            packed = selected if packed is None else packed & selected
+        if packed is None:
+            return np.arange(self.size)
+        return np.flatnonzero(np.unpackbits(packed, count=self.size))
+
+    def select(self, df, selections, within=None):
+        """The rows of ``df`` (the frame the index was built from) matching ``selections``."""
+        if len(df) != self.size:
+            raise ValueError(f'FilterIndex was built for {self.size} rows, got a frame of {len(df)}')
+        return df.iloc[self.positions(selections, within)]
+
+
+def chosen(value, all_label='All'):
+    """A selectbox choice as a FilterIndex selection: nothing for ``all_label``, else just that value."""
+    return [] if value == all_label else [value]
@@ -0,0 +1,64 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_email(series):
+    """Emails as used for matching learners across sources: stripped and lowercased."""
+    return series.str.strip().str.lower()
+
+
+class LearnerIndex:
+    """Append-only mapping from normalized email to a dense int32 learner id.
+
+    Ids are handed out in order of first appearance and never change for the life of
+    the index, so frames built at different times from the same index can be joined or
+    counted on ``learner_id`` together. ``emails()`` is the reverse lookup.
+    """
+
+    def __init__(self, emails=()):
+        self._ids = {}
+        self._emails = []
+        self._lock = threading.Lock()
+        if len(emails):
+            self.ids(pd.Series(emails, dtype=object))
+
+    def __len__(self):
+        return len(self._emails)
+
+    def ids(self, emails):
+        """int32 learner ids for a Series of normalized emails, assigning ids to new ones.
+
+        Each distinct email is looked up once; missing emails get -1.
+        """
+        codes, uniques = pd.factorize(emails)
+        unique_ids = np.empty(len(uniques) + 1, dtype=np.int32)
+        unique_ids[-1] = -1  # code -1 (missing) picks this
+        with self._lock:
+            for position, email in enumerate(uniques):
+                learner_id = self._ids.get(email)
+                if learner_id is None:
+                    learner_id = self._ids[email] = len(self._emails)
+                    self._emails.append(email)
+                unique_ids[position] = learner_id
+        return unique_ids[codes]
+
+    def emails(self, ids):
+        """Reverse lookup: the email of each learner id in ``ids``."""
+        with self._lock:
+            table = np.asarray(self._emails, dtype=object)
+        return table[np.asarray(ids)]
+
+    def table(self):
+        """All learners as a ``learner_id``/``email`` frame, e.g. to store next to frames using the ids."""
+        with self._lock:
+            emails = list(self._emails)
+        return pd.DataFrame({'learner_id': np.arange(len(emails), dtype=np.int32), 'email': pd.Series(emails, dtype=object)})
+
+    def remap(self, ids, table):
+        """Translate ``ids`` assigned by another index, whose ``table()`` is given, into this index's ids."""
+        translated = self.ids(table['email'])
+        lookup = np.full(int(table['learner_id'].max()) + 2 if len(table) else 1, -1, dtype=np.int32)
+        lookup[table['learner_id'].to_numpy()] = translated
+        return lookup[np.asarray(ids)]
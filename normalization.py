@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# Gender as written in Discovery and SAP (stripped, lowercased) -> normalized label; anything else is 'n/a'
+GENDER_VALUES = {
+    'male': 'Male',
+    'laki-laki': 'Male',
+    'laki - laki': 'Male',
+    'pria': 'Male',
+    'm': 'Male',
+    'female': 'Female',
+    'perempuan': 'Female',
+    'wanita': 'Female',
+    'f': 'Female',
+}
+
+# Placeholder company names -> 'N/A'; other companies are kept as they are
+COMPANY_VALUES = {
+    '-': 'N/A',
+    '.': 'N/A',
+    '0': 'N/A',
+    'n/a': 'N/A',
+    'N/a': 'N/A',
+    'NA': 'N/A',
+}
+
+# SAP layer -> layer group shown on the Layer Traits page; unknown layers get no group
+LAYER_GROUPS = {
+    'Group 5 Str Layer 1': 'Layer 1',
+    'Group 4 Str Layer 2': 'Layer 2',
+    'Group 3 Str Layer 3B': 'Layer 3',
+    'Group 3 Str Layer 3A': 'Layer 3',
+    'Group 2 Str Layer 4': 'Layer 4',
+    'Group 1 Str Layer 5': 'Layer 5',
+    'Group 1': 'Non Struktural',
+    'Group 2': 'Non Struktural',
+    'Group 3': 'Non Struktural',
+    'Group 4': 'Non Struktural',
+    'Group 5': 'Non Struktural',
+}
+
+# Default meaning "keep the original value"
+KEEP = object()
+
+
+def map_values(series, table, key=None, default=KEEP):
+    """Map ``series`` through ``table`` once per distinct value instead of once per row.
+
+    The series is factorized into integer codes and its unique values; ``key`` (if
+    given) turns a unique value into the table key, values missing from the table
+    become ``default`` (or stay as they are), and the mapped uniques are gathered back
+    by code. Categorical series already carry their codes, so they aren't factorized again.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Missing values have code -1, which picks the trailing NaN
+        codes = series.cat.codes.to_numpy()
+        uniques = list(series.cat.categories) + [np.nan]
+    else:
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    for position, value in enumerate(uniques):
+        lookup = key(value) if key is not None else value
+        mapped[position] = table.get(lookup, value if default is KEEP else default)
+    return pd.Series(mapped[codes], index=series.index, name=series.name, dtype=object)
+
+
+def to_category(series):
+    """``series`` as a categorical whose categories are its distinct values in sorted order.
+
+    The order only depends on which values occur, so it's the same on every refresh and
+    sorting or grouping on the column orders rows as sorting the strings would. Columns
+    that aren't all strings are returned unchanged.
+    """
+    codes, uniques = pd.factorize(series)
+    if (codes < 0).any() or not all(isinstance(value, str) for value in uniques):
+        return series
+    order = np.argsort(np.asarray(uniques, dtype=object), kind='stable')
+    recode = np.empty(len(order), dtype=codes.dtype)
+    recode[order] = np.arange(len(order))
+    categorical = pd.Categorical.from_codes(recode[codes], categories=np.asarray(uniques, dtype=object)[order])
+    return pd.Series(categorical, index=series.index, name=series.name)
+
+
+def normalize_gender(series):
+    return map_values(series, GENDER_VALUES, key=lambda value: str(value).strip().lower(), default='n/a')
+
+
+def clean_company(series):
+    # Compared as text, so a 0 the Sheets reader turned into a number is cleaned too
+    return map_values(series, COMPANY_VALUES, key=lambda value: str(value).strip())
+
+
+def layer_group(series):
+    return map_values(series, LAYER_GROUPS, default=np.nan)
@@ -1,14 +1,16 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from data_processing import finalize_data
+from data_processing import get_indexed_dataset
+from filter_index import chosen
 from datetime import datetime
 
 # Set the title and favicon in the browser tab
 st.set_page_config(page_title='Demography', page_icon='🌍')
 
 # Retrieve data from data_processing
-df_discovery, df_sap, df_merged, df_combined_au_capture, df_capture_sheet3 = finalize_data()
+df_merged, indexes = get_indexed_dataset('merged')
+dates, filters, learner_counts = indexes.dates, indexes.filters, indexes.counts
 
 # Display logo at the top of the sidebar
 st.logo('kognisi_logo.png')
@@ -53,7 +55,7 @@ In the Active Learners Growth Discovery - Capture, the key user metrics include:
 st.markdown('---')
 
 # Date filter setup
-min_value, max_value = df_merged['last_updated'].min(), df_merged['last_updated'].max()
+min_value, max_value = dates.min().date(), dates.max().date()
 
 # Initialize session state for date filters
 if 'from_date' not in st.session_state:
@@ -89,38 +91,29 @@ from_date, to_date = st.date_input(
 # Update session state with manual input
 st.session_state.from_date, st.session_state.to_date = from_date, to_date
 
-# Data filtering based on selected dates and platform
-filtered_df = df_merged[
-    (df_merged['last_updated'] >= from_date) & 
-    (df_merged['last_updated'] <= to_date)
-]
-
-if selected_platform != 'All':
-    filtered_df = filtered_df[filtered_df['platform'] == selected_platform]
-
-if selected_status != 'All':
-    filtered_df = filtered_df[filtered_df['status_learner'] == selected_status]
-
-if selected_unit:
-    filtered_df = filtered_df[filtered_df['unit'].isin(selected_unit)]
-
-if selected_layer:
-    filtered_df = filtered_df[filtered_df['layer'].isin(selected_layer)]
-
-if selected_title:
-    filtered_df = filtered_df[filtered_df['title'].isin(selected_title)]
-
-if selected_company:
-    filtered_df = filtered_df[filtered_df['Company'].isin(selected_company)]
-
-if selected_institution:
-    filtered_df = filtered_df[filtered_df['institution'].isin(selected_institution)]
+# Data filtering based on selected dates and sidebar filters; the rows are only taken once every filter is combined
+filtered_df = filters.select(df_merged, {
+    'platform': chosen(selected_platform),
+    'status_learner': chosen(selected_status),
+    'unit': selected_unit,
+    'layer': selected_layer,
+    'title': selected_title,
+    'Company': selected_company,
+    'institution': selected_institution,
+}, within=dates.positions_between(from_date, to_date))
 
 # Active Users section
 st.header('Active Learners', divider='gray')
-total_count = filtered_df['email'].nunique()
-internal_count = filtered_df[filtered_df['status_learner'] == 'Internal']['email'].nunique()
-external_count = filtered_df[filtered_df['status_learner'] == 'External']['email'].nunique()
+if any([selected_unit, selected_layer, selected_title, selected_company, selected_institution]):
+    total_count = filtered_df['learner_id'].nunique()
+    internal_count = filtered_df[filtered_df['status_learner'] == 'Internal']['learner_id'].nunique()
+    external_count = filtered_df[filtered_df['status_learner'] == 'External']['learner_id'].nunique()
+else:
+    # Only dates, platform and status are filtered: answer from the precomputed daily counts
+    platform = None if selected_platform == 'All' else selected_platform
+    total_count = learner_counts.count(from_date, to_date, platform=platform, status_learner=None if selected_status == 'All' else selected_status)
+    internal_count = learner_counts.count(from_date, to_date, platform=platform, status_learner='Internal') if selected_status in ('All', 'Internal') else 0
+    external_count = learner_counts.count(from_date, to_date, platform=platform, status_learner='External') if selected_status in ('All', 'External') else 0
 
 # Display metrics columns
 col1, col2, col3 = st.columns(3)
@@ -136,8 +129,8 @@ st.subheader('Test Date Distribution', divider='gray')
 
 # Count unique active learners by test date
 active_learners_counts = (filtered_df
-    .groupby('last_updated')
-    .agg(active_learners=('email', 'nunique'))
+    .groupby('last_updated', observed=True)
+    .agg(active_learners=('learner_id', 'nunique'))
     .reset_index())
 
 # Create a line chart for active learners
@@ -200,11 +193,6 @@ breakdown_mapping = {
     'Province': 'Province'
 }
 
-# Clean data in the Company column
-filtered_df.loc[:, 'Company'] = filtered_df['Company'].replace(
-    ['-', '.', '0', 'n/a', 'N/a', 'NA'], 'N/A', regex=False
-)
-
 # Process selected breakdown
 if selected_breakdown in breakdown_mapping:
     breakdown_column = breakdown_mapping[selected_breakdown]
@@ -212,21 +200,21 @@ if selected_breakdown in breakdown_mapping:
     # Calculate active learners
     counts = (
         filtered_df
-        .groupby(['status_learner', breakdown_column])
-        .agg(active_learners=('email', 'nunique'))
+        .groupby(['status_learner', breakdown_column], observed=True)
+        .agg(active_learners=('learner_id', 'nunique'))
         .reset_index()
     )
 
     # Handle specific breakdowns
     if selected_breakdown in ['Unit', 'Generation']:
-        counts = counts.groupby([breakdown_column, 'status_learner']).agg({'active_learners': 'sum'}).reset_index()
+        counts = counts.groupby([breakdown_column, 'status_learner'], observed=True).agg({'active_learners': 'sum'}).reset_index()
         chart_title = f'Breakdown by {selected_breakdown}'
         chart = create_bar_chart_with_text(counts, 'active_learners', breakdown_column, chart_title)
         st.altair_chart(chart, use_container_width=True)
 
     elif selected_breakdown == 'Layer':
-        counts = counts.groupby([breakdown_column, 'status_learner']).agg({'active_learners': 'sum'}).reset_index()
-        total_counts = counts.groupby(breakdown_column).agg(total_active_learners=('active_learners', 'sum')).reset_index()
+        counts = counts.groupby([breakdown_column, 'status_learner'], observed=True).agg({'active_learners': 'sum'}).reset_index()
+        total_counts = counts.groupby(breakdown_column, observed=True).agg(total_active_learners=('active_learners', 'sum')).reset_index()
         counts = counts.merge(total_counts, on=breakdown_column)
         counts['percentage'] = (counts['active_learners'] / counts['total_active_learners']) * 100
         counts = counts.sort_values(by='total_active_learners', ascending=False)
@@ -255,7 +243,7 @@ if selected_breakdown in breakdown_mapping:
 
     elif selected_breakdown in ['Institution', 'Company', 'Last Education', 'Province']:
         # Calculate total active learners and handle top 10 filtering
-        total_counts = counts.groupby(breakdown_column).agg(
+        total_counts = counts.groupby(breakdown_column, observed=True).agg(
             total_active_learners=('active_learners', 'sum')
         ).reset_index()
 
@@ -323,7 +311,7 @@ if selected_breakdown in breakdown_mapping:
             st.altair_chart(chart, use_container_width=True)
     
     elif selected_breakdown == 'Last Education':
-        total_counts = counts.groupby(breakdown_column).agg(total_active_learners=('active_learners', 'sum')).reset_index()
+        total_counts = counts.groupby(breakdown_column, observed=True).agg(total_active_learners=('active_learners', 'sum')).reset_index()
         counts = counts.merge(total_counts, on=breakdown_column)
         counts['percentage'] = (counts['active_learners'] / counts['total_active_learners']) * 100
         stacked_bar_chart = alt.Chart(counts).mark_bar().encode(
@@ -345,8 +333,8 @@ if selected_breakdown in breakdown_mapping:
         # filtered_gender_df = filtered_df[filtered_df['gender'] != 'n/a']
         gender_counts = (
             filtered_df
-            .groupby(['status_learner', 'gender'])
-            .agg(active_learners=('email', 'nunique'))
+            .groupby(['status_learner', 'gender'], observed=True)
+            .agg(active_learners=('learner_id', 'nunique'))
             .reset_index()
         )
 
@@ -1,14 +1,19 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from data_processing import finalize_data
+from data_processing import get_indexed_dataset, rows_in
+from bundle_analytics import final_result_distribution, for_bundle, typology_distribution
+from filter_index import chosen
 from datetime import datetime
 
 # Set the title and favicon in the browser tab
 st.set_page_config(page_title='Result Traits Summary', page_icon='📊')
 
 # Retrieve data from data_processing
-df_discovery, df_sap, df_merged, df_combined_au_capture, df_capture_sheet3 = finalize_data()
+df_merged, indexes = get_indexed_dataset('merged')
+dates, filters = indexes.dates, indexes.filters
+# Highest score of every attempt, reduced once per data version
+best_scores = indexes.derived['best_scores']
 
 # Display logo at the top of the sidebar
 st.logo('kognisi_logo.png')
@@ -26,7 +31,7 @@ platform_options = ['All'] + df_merged['platform'].unique().tolist()
 selected_platform = st.sidebar.selectbox('Select Platform', platform_options, index=0)
 
 # Filter the data based on the selected platform for dynamic options
-filtered_platform_df = df_merged if selected_platform == 'All' else df_merged[df_merged['platform'] == selected_platform]
+filtered_platform_df = filters.select(df_merged, {'platform': chosen(selected_platform)})
 
 # Sidebar filters
 unit_options = filtered_platform_df['unit'].unique().tolist()
@@ -45,7 +50,7 @@ company_options = filtered_platform_df['Company'].unique().tolist()
 selected_company = st.sidebar.multiselect('Select Company', company_options)
 
 # Date filter setup
-min_value, max_value = df_merged['last_updated'].min(), df_merged['last_updated'].max()
+min_value, max_value = dates.min().date(), dates.max().date()
 
 # Initialize session state for date filters
 if 'from_date' not in st.session_state:
@@ -81,24 +86,15 @@ from_date, to_date = st.date_input(
 # Update session state with manual input
 st.session_state.from_date, st.session_state.to_date = from_date, to_date
 
-# Data filtering based on selected filters
-filtered_df = df_merged[
-    (df_merged['last_updated'] <= to_date) & 
-    (df_merged['last_updated'] >= from_date)
-]
-
-if selected_platform != 'All':
-    filtered_df = filtered_df[filtered_df['platform'] == selected_platform]
-if selected_status != 'All':
-    filtered_df = filtered_df[filtered_df['status_learner'] == selected_status]
-if selected_units:
-    filtered_df = filtered_df[filtered_df['unit'].isin(selected_units)]
-if selected_layers:
-    filtered_df = filtered_df[filtered_df['layer'].isin(selected_layers)]
-if selected_titles:
-    filtered_df = filtered_df[filtered_df['title'].isin(selected_titles)]
-if selected_company:
-    filtered_df = filtered_df[filtered_df['Company'].isin(selected_company)]
+# Data filtering based on selected filters; the rows are only taken once every filter is combined
+filtered_df = filters.select(df_merged, {
+    'platform': chosen(selected_platform),
+    'status_learner': chosen(selected_status),
+    'unit': selected_units,
+    'layer': selected_layers,
+    'title': selected_titles,
+    'Company': selected_company,
+}, within=dates.positions_between(from_date, to_date))
 
 # Display horizontal stacked bar chart of platform per unit if 'All' is selected for platform
 if selected_platform == 'All':
@@ -106,18 +102,18 @@ if selected_platform == 'All':
     
     # Group data to calculate counts and unique emails
     platform_unit_df = (
-        filtered_df.groupby(['unit', 'platform'])
-        .agg(count=('email', 'size'), Active_Learners=('email', 'nunique'))
+        filtered_df.groupby(['unit', 'platform'], observed=True)
+        .agg(count=('email', 'size'), Active_Learners=('learner_id', 'nunique'))
         .reset_index()
     )
 
     # Calculate total counts per unit
-    platform_unit_df['total'] = platform_unit_df.groupby('unit')['count'].transform('sum')
+    platform_unit_df['total'] = platform_unit_df.groupby('unit', observed=True)['count'].transform('sum')
     platform_unit_df['percent'] = platform_unit_df['count'] / platform_unit_df['total'] * 100
 
     # Sort units by total count of all platforms
     sorted_units = (
-        platform_unit_df.groupby('unit')['count']
+        platform_unit_df.groupby('unit', observed=True)['count']
         .sum()
         .sort_values(ascending=False)
         .index.tolist()
@@ -149,9 +145,10 @@ if selected_platform == 'All':
 # Active Users section for Discovery
 if selected_platform == 'Discovery':
     st.header('Active Learners - Discovery', divider='gray')
-    total_count = filtered_df['email'].nunique()
-    internal_count = filtered_df[filtered_df['status_learner'] == 'Internal']['Customer ID'].nunique()
-    external_count = filtered_df[filtered_df['status_learner'] == 'External']['Customer ID'].nunique()
+    total_count = filtered_df['learner_id'].nunique()
+    # Learners without a customer row have no Customer ID; together they count as one, as 'N/A' did
+    internal_count = filtered_df[filtered_df['status_learner'] == 'Internal']['Customer ID'].nunique(dropna=False)
+    external_count = filtered_df[filtered_df['status_learner'] == 'External']['Customer ID'].nunique(dropna=False)
 
     # Display metrics columns
     col1, col2, col3 = st.columns(3)
@@ -166,8 +163,8 @@ if selected_platform == 'Discovery':
     bundle_names = ['GI', 'LEAN', 'ELITE', 'Genuine', 'Astaka']
     if 'title' in filtered_df.columns:
         # Group by bundle_name and count unique Customer IDs
-        df_active_learners = filtered_df.groupby(['Customer ID', 'title']).size().reset_index(name='test_count')
-        bundle_counts = {bundle: df_active_learners[df_active_learners['title'] == bundle]['Customer ID'].nunique() for bundle in bundle_names}
+        df_active_learners = filtered_df.groupby(['Customer ID', 'title'], observed=True, dropna=False).size().reset_index(name='test_count')
+        bundle_counts = {bundle: df_active_learners[df_active_learners['title'] == bundle]['Customer ID'].nunique(dropna=False) for bundle in bundle_names}
 
         # Display active learners counts
         st.markdown("<h3>ACTIVE LEARNERS by Bundle</h3>", unsafe_allow_html=True)
@@ -205,263 +202,97 @@ if selected_platform == 'Discovery':
             st.download_button("Download Data", data=csv, file_name="Top_Test_Discovery.csv", mime="text/csv", help='Click here to download the data as a CSV file')
 
         
-        # Active learners data for Bundle GI
-        gi_active_learners = filtered_df[filtered_df['title'] == 'GI']
-
-        # Get highest scores
-        highest_scores = gi_active_learners.loc[gi_active_learners.groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()]
-        gi_active_learners_data = highest_scores[['name', 'email', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']]
-
-        # Stacked bar chart for Growth Inventory
-        st.subheader("Growth Inventory")
-        gi_filtered = filtered_df[filtered_df['title'] == 'GI']
-        gi_distribution = gi_filtered.groupby(['Test Name', 'typology']).agg({'Customer ID': 'nunique'}).reset_index()
-        gi_distribution.columns = ['Test Name', 'typology', 'Active Users']
-
-        # Calculate percentages
-        total_active_users_per_test = gi_distribution.groupby('Test Name')['Active Users'].transform('sum')
-        gi_distribution['Percentage'] = (gi_distribution['Active Users'] / total_active_users_per_test * 100).round(2)
-
-        # Plot chart
-        chart = alt.Chart(gi_distribution).mark_bar().encode(
-            x='Test Name',
-            y='Active Users',
-            color='typology',
-            tooltip=[
-                alt.Tooltip('Test Name:N', title='Test Name'),
-                alt.Tooltip('typology:N', title='Typology'),
-                alt.Tooltip('Active Users:Q', title='Active Learners'),
-                alt.Tooltip('Percentage:Q', title='Percentage', format='.1f')  # Format percentage with one decimal place
-            ]
-        ).properties(
-            width=600,
-            height=400
-        ).configure_mark(
-            opacity=0.8
-        ).configure_axis(
-            labelFontSize=12,
-            titleFontSize=14
-        ).configure_title(
-            fontSize=16
-        )
-
-        st.altair_chart(chart, use_container_width=True)
-
-        # Data download for Growth Inventory
-        with st.expander("Data Growth Inventory"):
-            st.write(gi_distribution)
-            csv = gi_distribution.to_csv(index=False).encode('utf-8')
-            st.download_button("Download Data", data=csv, file_name="Growth_Inventory.csv", mime="text/csv", help='Click here to download the data as a CSV file')
-
-
-        # Repeat for LEAN
-        lean_active_learners = filtered_df[filtered_df['title'] == 'LEAN']
-
-        # Get highest scores for LEAN
-        highest_scores_lean = lean_active_learners.loc[lean_active_learners.groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()]
-        lean_active_learners_data = highest_scores_lean[['name', 'email', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']]
-
-        # Stacked bar chart for LEAN
-        st.subheader("LEAN")
-        lean_filtered = filtered_df[filtered_df['title'] == 'LEAN']
-        lean_distribution = lean_filtered.groupby(['Test Name', 'typology']).agg({'Customer ID': 'nunique'}).reset_index()
-        lean_distribution.columns = ['Test Name', 'typology', 'Active Users']
-
-        # Calculate percentages for LEAN
-        total_active_users_per_test_lean = lean_distribution.groupby('Test Name')['Active Users'].transform('sum')
-        lean_distribution['Percentage'] = (lean_distribution['Active Users'] / total_active_users_per_test_lean * 100).round(2)
-
-        # Plot chart for LEAN
-        chart_lean = alt.Chart(lean_distribution).mark_bar().encode(
-            x='Test Name',
-            y='Active Users',
-            color='typology',
-            tooltip=[
-                alt.Tooltip('Test Name:N', title='Test Name'),
-                alt.Tooltip('typology:N', title='Typology'),
-                alt.Tooltip('Active Users:Q', title='Active Learners'),
-                alt.Tooltip('Percentage:Q', title='Percentage', format='.1f')  # Format percentage with one decimal place
-            ]
-        ).properties(
-            width=600,
-            height=400
-        ).configure_mark(
-            opacity=0.8
-        ).configure_axis(
-            labelFontSize=12,
-            titleFontSize=14
-        ).configure_title(
-            fontSize=16
-        )
-
-        st.altair_chart(chart_lean, use_container_width=True)
-
-        # Data download for LEAN
-        with st.expander("Data LEAN"):
-            st.write(lean_distribution)
-            csv_lean = lean_distribution.to_csv(index=False).encode('utf-8')
-            st.download_button("Download Data", data=csv_lean, file_name="LEAN.csv", mime="text/csv", help='Click here to download the data as a CSV file')
-
-        # Display final result distribution
-        st.subheader("FINAL RESULT LEAN")
-        lean_active_learners = filtered_df[filtered_df['title'] == 'LEAN']
-
-        # Get highest scores for LEAN
-        highest_scores_lean = lean_active_learners.loc[lean_active_learners.groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()]
-        lean_active_learners_data = highest_scores_lean[['name', 'email', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']]
-        
-        # Get unique combinations of Customer ID and Test Date
-        unique_combinations = lean_active_learners_data[['Customer ID', 'last_updated']].drop_duplicates()
-
-        # Merge back to get final_result
-        unique_results = unique_combinations.merge(lean_active_learners_data[['Customer ID', 'last_updated', 'final_result']],
-                                                   on=['Customer ID', 'last_updated'], 
-                                                   how='left').drop_duplicates()
-
-        # Aggregate final_result for pie chart
-        final_result_counts = unique_results['final_result'].value_counts().reset_index()
-        final_result_counts.columns = ['Final Result', 'Count']
-
-        # Calculate percentage
-        final_result_counts['Percentage'] = (final_result_counts['Count'] / final_result_counts['Count'].sum()) * 100
-
-        # Plot pie chart for final results
-        pie_chart = alt.Chart(final_result_counts).mark_arc().encode(
-            theta='Count:Q',
-            color='Final Result:N',
-            tooltip=[
-                alt.Tooltip('Final Result:N', title='Final Result'),
-                alt.Tooltip('Count:Q', title='Active Learners'),
-                alt.Tooltip('Percentage:Q', title='Percentage', format='.1f')  # Format percentage with one decimal place
-            ]
-        ).properties(
-            width=400,
-            height=400
-        )
-
-        st.altair_chart(pie_chart, use_container_width=True)
-
-        # Expander for final result data
-        with st.expander("View Final Result Data"):
-            st.write(final_result_counts)
-            csv_final = final_result_counts.to_csv(index=False).encode('utf-8')  # Convert to CSV
-            st.download_button(
-                label="Download Final Result Data", 
-                data=csv_final, 
-                file_name="Final_Results_LEAN.csv", 
-                mime="text/csv",
-                help='Click here to download the final result data as a CSV file'
-        )
-
-        # Repeat for ELITE
-        elite_active_learners = filtered_df[filtered_df['title'] == 'ELITE']
-
-        # Get highest scores for ELITE
-        highest_scores_elite = elite_active_learners.loc[elite_active_learners.groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()]
-        elite_active_learners_data = highest_scores_elite[['name', 'email', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']]
-
-        # Stacked bar chart for ELITE
-        st.subheader("ELITE")
-        elite_filtered = filtered_df[filtered_df['title'] == 'ELITE']
-        elite_distribution = elite_filtered.groupby(['Test Name', 'typology']).agg({'Customer ID': 'nunique'}).reset_index()
-        elite_distribution.columns = ['Test Name', 'typology', 'Active Users']
-
-        # Calculate percentages for ELITE
-        total_active_users_per_test_elite = elite_distribution.groupby('Test Name')['Active Users'].transform('sum')
-        elite_distribution['Percentage'] = (elite_distribution['Active Users'] / total_active_users_per_test_elite * 100).round(2)
-
-        # Plot chart for ELITE
-        chart_elite = alt.Chart(elite_distribution).mark_bar().encode(
-            x='Test Name',
-            y='Active Users',
-            color='typology',
-            tooltip=[
-                alt.Tooltip('Test Name:N', title='Test Name'),
-                alt.Tooltip('typology:N', title='Typology'),
-                alt.Tooltip('Active Users:Q', title='Active Learners'),
-                alt.Tooltip('Percentage:Q', title='Percentage', format='.1f')  # Format percentage with one decimal place
-            ]
-        ).properties(
-            width=600,
-            height=400
-        ).configure_mark(
-            opacity=0.8
-        ).configure_axis(
-            labelFontSize=12,
-            titleFontSize=14
-        ).configure_title(
-            fontSize=16
-        )
-
-        st.altair_chart(chart_elite, use_container_width=True)
-
-        # Data download for ELITE
-        with st.expander("Data ELITE"):
-            st.write(elite_distribution)
-            csv_elite = elite_distribution.to_csv(index=False).encode('utf-8')
-            st.download_button("Download Data", data=csv_elite, file_name="ELITE.csv", mime="text/csv", help='Click here to download the data as a CSV file')
-
-        # Display final result distribution
-        st.subheader("FINAL RESULT ELITE")
-        elite_active_learners = filtered_df[filtered_df['title'] == 'ELITE']
+        # Typology distribution of every bundle, and final results of LEAN and ELITE, each computed once
+        typologies = typology_distribution(filtered_df)
+        final_results = final_result_distribution(rows_in(best_scores, filtered_df))
+
+        # Bundle -> (subheader, expander label, CSV file name)
+        typology_bundles = {
+            'GI': ('Growth Inventory', 'Data Growth Inventory', 'Growth_Inventory.csv'),
+            'LEAN': ('LEAN', 'Data LEAN', 'LEAN.csv'),
+            'ELITE': ('ELITE', 'Data ELITE', 'ELITE.csv'),
+        }
+        for bundle_name, (subheader, expander_label, file_name) in typology_bundles.items():
+            # Stacked bar chart of the bundle's typologies per test
+            st.subheader(subheader)
+            distribution = for_bundle(typologies, bundle_name)
+
+            # Plot chart
+            chart = alt.Chart(distribution).mark_bar().encode(
+                x='Test Name',
+                y='Active Users',
+                color='typology',
+                tooltip=[
+                    alt.Tooltip('Test Name:N', title='Test Name'),
+                    alt.Tooltip('typology:N', title='Typology'),
+                    alt.Tooltip('Active Users:Q', title='Active Learners'),
+                    alt.Tooltip('Percentage:Q', title='Percentage', format='.1f')  # Format percentage with one decimal place
+                ]
+            ).properties(
+                width=600,
+                height=400
+            ).configure_mark(
+                opacity=0.8
+            ).configure_axis(
+                labelFontSize=12,
+                titleFontSize=14
+            ).configure_title(
+                fontSize=16
+            )
 
-        # Get highest scores for ELITE
-        highest_scores_elite = elite_active_learners.loc[elite_active_learners.groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()]
-        elite_active_learners_data = highest_scores_elite[['name', 'email', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']]
-        
-        # Get unique combinations of Customer ID and Test Date
-        unique_combinations = elite_active_learners_data[['Customer ID', 'last_updated']].drop_duplicates()
-
-        # Merge back to get final_result
-        unique_results = unique_combinations.merge(elite_active_learners_data[['Customer ID', 'last_updated', 'final_result']],
-                                                   on=['Customer ID', 'last_updated'], 
-                                                   how='left').drop_duplicates()
-
-        # Aggregate final_result for pie chart
-        final_result_counts = unique_results['final_result'].value_counts().reset_index()
-        final_result_counts.columns = ['Final Result', 'Count']
-
-        # Calculate percentage
-        final_result_counts['Percentage'] = (final_result_counts['Count'] / final_result_counts['Count'].sum()) * 100
-
-        # Plot pie chart for final results
-        pie_chart = alt.Chart(final_result_counts).mark_arc().encode(
-            theta='Count:Q',
-            color='Final Result:N',
-            tooltip=[
-                alt.Tooltip('Final Result:N', title='Final Result'),
-                alt.Tooltip('Count:Q', title='Active Learners'),
-                alt.Tooltip('Percentage:Q', title='Percentage', format='.1f')  # Format percentage with one decimal place
-            ]
-        ).properties(
-            width=400,
-            height=400
-        )
+            st.altair_chart(chart, use_container_width=True)
+
+            # Data download for the bundle
+            with st.expander(expander_label):
+                st.write(distribution)
+                csv = distribution.to_csv(index=False).encode('utf-8')
+                st.download_button("Download Data", data=csv, file_name=file_name, mime="text/csv", help='Click here to download the data as a CSV file')
+
+            if bundle_name == 'GI':
+                continue
+
+            # Display final result distribution
+            st.subheader(f"FINAL RESULT {bundle_name}")
+            final_result_counts = for_bundle(final_results, bundle_name)
+
+            # Plot pie chart for final results
+            pie_chart = alt.Chart(final_result_counts).mark_arc().encode(
+                theta='Count:Q',
+                color='Final Result:N',
+                tooltip=[
+                    alt.Tooltip('Final Result:N', title='Final Result'),
+                    alt.Tooltip('Count:Q', title='Active Learners'),
+                    alt.Tooltip('Percentage:Q', title='Percentage', format='.1f')  # Format percentage with one decimal place
+                ]
+            ).properties(
+                width=400,
+                height=400
+            )
 
-        st.altair_chart(pie_chart, use_container_width=True)
-
-        # Expander for final result data
-        with st.expander("View Final Result Data"):
-            st.write(final_result_counts)
-            csv_final = final_result_counts.to_csv(index=False).encode('utf-8')  # Convert to CSV
-            st.download_button(
-                label="Download Final Result Data", 
-                data=csv_final, 
-                file_name="Final_Results_ELITE.csv", 
-                mime="text/csv",
-                help='Click here to download the final result data as a CSV file'
-        )
+            st.altair_chart(pie_chart, use_container_width=True)
+
+            # Expander for final result data
+            with st.expander("View Final Result Data"):
+                st.write(final_result_counts)
+                csv_final = final_result_counts.to_csv(index=False).encode('utf-8')  # Convert to CSV
+                st.download_button(
+                    label="Download Final Result Data",
+                    data=csv_final,
+                    file_name=f"Final_Results_{bundle_name}.csv",
+                    mime="text/csv",
+                    help='Click here to download the final result data as a CSV file'
+                )
             
         st.subheader("Genuine")
         # Filter DataFrame untuk bundle_name yang spesifik
         genuine_filtered = filtered_df[filtered_df['title'] == 'Genuine']
 
         # Get highest scores
-        highest_scores = genuine_filtered.loc[genuine_filtered.groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()]
+        highest_scores = rows_in(best_scores, genuine_filtered)
         genuine_active_learners_data = highest_scores[['name', 'email', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']].copy()
 
         # Add a rank column from 1 to 9 based on total_score for each Customer ID and Test Date
-        genuine_active_learners_data['rank'] = genuine_active_learners_data.groupby(['Customer ID', 'last_updated'])['total_score'].rank(ascending=False, method='first').astype(int)
+        genuine_active_learners_data['rank'] = genuine_active_learners_data.groupby(['Customer ID', 'last_updated'], observed=True, dropna=False)['total_score'].rank(ascending=False, method='first', na_option='bottom').astype(int)
 
         # Filter ranks from 1 to 9
         genuine_active_learners_data = genuine_active_learners_data[genuine_active_learners_data['rank'] <= 9]
@@ -473,7 +304,7 @@ if selected_platform == 'Discovery':
         filtered_rank_data = genuine_active_learners_data[genuine_active_learners_data['rank'] == genuine_rank]
 
         # Count the number of unique users for each test name at the selected rank
-        user_count_by_test = filtered_rank_data.groupby('Test Name')['Customer ID'].nunique().reset_index()
+        user_count_by_test = filtered_rank_data.groupby('Test Name', observed=True)['Customer ID'].nunique(dropna=False).reset_index()
         user_count_by_test.columns = ['Test Name', 'Total Active Users']
 
         # Display the results
@@ -485,11 +316,11 @@ if selected_platform == 'Discovery':
         astaka_filtered = filtered_df[filtered_df['title'] == 'Astaka']
 
         # Get highest scores
-        highest_scores = astaka_filtered.loc[astaka_filtered.groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()]
+        highest_scores = rows_in(best_scores, astaka_filtered)
         astaka_active_learners_data = highest_scores[['name', 'email', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']].copy()
 
         # Add a rank column from 1 to 6 based on total_score for each Customer ID and Test Date
-        astaka_active_learners_data['rank'] = astaka_active_learners_data.groupby(['Customer ID', 'last_updated'])['total_score'].rank(ascending=False, method='first').astype(int)
+        astaka_active_learners_data['rank'] = astaka_active_learners_data.groupby(['Customer ID', 'last_updated'], observed=True, dropna=False)['total_score'].rank(ascending=False, method='first', na_option='bottom').astype(int)
 
         # Filter ranks from 1 to 6
         astaka_active_learners_data = astaka_active_learners_data[astaka_active_learners_data['rank'] <= 6]
@@ -501,7 +332,7 @@ if selected_platform == 'Discovery':
         filtered_rank_data = astaka_active_learners_data[astaka_active_learners_data['rank'] == astaka_rank]
 
         # Count the number of unique users for each test name at the selected rank
-        user_count_by_test = filtered_rank_data.groupby('Test Name')['Customer ID'].nunique().reset_index()
+        user_count_by_test = filtered_rank_data.groupby('Test Name', observed=True)['Customer ID'].nunique(dropna=False).reset_index()
         user_count_by_test.columns = ['Test Name', 'Total Active Users']
 
         # Display the results
@@ -510,9 +341,9 @@ if selected_platform == 'Discovery':
 
 if selected_platform == 'Capture':
     st.header('Active Learners - Capture', divider='gray')
-    total_count = filtered_df['email'].nunique()
-    internal_count = filtered_df[filtered_df['status_learner'] == 'Internal']['email'].nunique()
-    external_count = filtered_df[filtered_df['status_learner'] == 'External']['email'].nunique()
+    total_count = filtered_df['learner_id'].nunique()
+    internal_count = filtered_df[filtered_df['status_learner'] == 'Internal']['learner_id'].nunique()
+    external_count = filtered_df[filtered_df['status_learner'] == 'External']['learner_id'].nunique()
 
     # Display metrics columns
     col1, col2, col3 = st.columns(3)
@@ -524,7 +355,7 @@ if selected_platform == 'Capture':
         st.markdown(f"<p style='font-size: 20px; text-align: center;'><strong>External User: <span style='color: red;'>{external_count:,}</span></strong></p>", unsafe_allow_html=True)
 
     # Count unique emails per title
-    title_counts = filtered_df.groupby('title')['email'].nunique().reset_index()
+    title_counts = filtered_df.groupby('title', observed=True)['learner_id'].nunique().reset_index()
     title_counts.columns = ['title', 'active_learners']
 
     # Sort the data from highest to lowest
@@ -1,7 +1,8 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from data_processing import finalize_data
+from data_processing import get_indexed_dataset, rows_in
+from bundle_analytics import overall_final_results
 
 # Setting page title and favicon
 st.set_page_config(page_title='Layer Traits Summary')
@@ -25,40 +26,15 @@ st.markdown("""
     - **Non Struktural** adalah Group 1, Group 2, Group 3, Group 4 dan Group 5 
 """)
 
-# Caching function for loading and processing data
-@st.cache_data
-def load_and_process_data():
-    # Load and process data
-    df_discovery, df_sap, df_merged, df_combined_au_capture, df_capture_sheet3 = finalize_data()
-    return df_merged
-
-# Load data with caching
-df_merged = load_and_process_data()
-
-# Filter data for internal users
-internal_df = df_merged[df_merged['status_learner'] == 'Internal']
-
-# Mapping for grouping layers
-layer_mapping = {
-    'Group 5 Str Layer 1': 'Layer 1',
-    'Group 4 Str Layer 2': 'Layer 2',
-    'Group 3 Str Layer 3B': 'Layer 3',
-    'Group 3 Str Layer 3A': 'Layer 3',
-    'Group 2 Str Layer 4': 'Layer 4',
-    'Group 1 Str Layer 5': 'Layer 5',
-    'Group 1': 'Non Struktural',
-    'Group 2': 'Non Struktural',
-    'Group 3': 'Non Struktural',
-    'Group 4': 'Non Struktural',
-    'Group 5': 'Non Struktural'
-
-}
-
-# Pastikan sebelum ada modifikasi, kita copy dulu datanya
-internal_df = internal_df.copy()
-
-# Apply the mapping to create a new column for grouped layers
-internal_df.loc[:, 'layer_group'] = internal_df['layer'].map(layer_mapping)
+# Load data (cached in data_processing)
+df_merged, indexes = get_indexed_dataset('merged')
+filters = indexes.filters
+# Highest score of every attempt and latest result of every test, reduced once per data version
+best_scores, latest_results_per_test = indexes.derived['best_scores'], indexes.derived['latest_results']
+
+# Filter data for internal users; 'layer_group' is already derived from 'layer' in data_processing.
+# Each filter narrows the selections; the rows are only taken once all of them are combined
+selections = {'status_learner': ['Internal']}
 
 # Sidebar filters with multiselect
 st.sidebar.header("Filter Options")
@@ -69,50 +45,49 @@ selected_layers = st.sidebar.multiselect(
 )
 
 # Filter based on selected layers
-df_filtered = internal_df[internal_df['layer_group'].isin(selected_layers)] if selected_layers else internal_df
+selections['layer_group'] = selected_layers
 
-# Add unit filter to the sidebar
+# Add unit filter to the sidebar, offering the units left after the filters above
 selected_units = st.sidebar.multiselect(
     "Select Unit",
-    options=df_filtered['unit'].unique(),
+    options=df_merged['unit'].iloc[filters.positions(selections)].unique(),
     default=[]
 )
 
 # Apply unit filter if units are selected
-if selected_units:
-    df_filtered = df_filtered[df_filtered['unit'].isin(selected_units)]
+selections['unit'] = selected_units
 
 # Add subunit filter to the sidebar
 selected_subunits = st.sidebar.multiselect(
     "Select Subunit",
-    options=df_filtered['subunit'].unique(),
+    options=df_merged['subunit'].iloc[filters.positions(selections)].unique(),
     default=[]
 )
 
 # Apply unit filter if units are selected
-if selected_subunits:
-    df_filtered = df_filtered[df_filtered['subunit'].isin(selected_subunits)]
+selections['subunit'] = selected_subunits
 
 # Add years filter to the sidebar
 selected_years = st.sidebar.multiselect(
     "Select Years",
-    options=df_filtered['tenure'].unique(),
+    options=df_merged['tenure'].iloc[filters.positions(selections)].unique(),
     default=[]
 )
 
 # Apply unit filter if units are selected
-if selected_years:
-    df_filtered = df_filtered[df_filtered['tenure'].isin(selected_years)]
+selections['tenure'] = selected_years
+df_filtered = filters.select(df_merged, selections)
 
 # Active learners by bundle
 bundle_names = ['GI', 'LEAN', 'ELITE', 'Genuine', 'Astaka']
 
 # Create filtered dataframe for active learners
 if 'title' in df_filtered.columns:
-    df_active_learners = df_filtered.groupby(['Customer ID', 'last_updated', 'title']).size().reset_index(name='test_count')
+    # Learners without a customer row have no Customer ID; together they count as one, as 'N/A' did
+    df_active_learners = df_filtered.groupby(['Customer ID', 'last_updated', 'title'], observed=True, dropna=False).size().reset_index(name='test_count')
 
     # Count active learners per bundle
-    bundle_counts = {bundle: df_active_learners[df_active_learners['title'] == bundle]['Customer ID'].nunique() for bundle in bundle_names}
+    bundle_counts = {bundle: df_active_learners[df_active_learners['title'] == bundle]['Customer ID'].nunique(dropna=False) for bundle in bundle_names}
 
     # Display active learners counts
     st.markdown("<h3>ACTIVE LEARNERS</h3>", unsafe_allow_html=True)
@@ -124,59 +99,34 @@ if 'title' in df_filtered.columns:
                 
 
 # 1. Get the latest test results for each email and Test Name
-latest_test_results = df_filtered.loc[df_filtered.groupby(['email', 'Test Name'])['last_updated'].idxmax()]
+latest_test_results = rows_in(latest_results_per_test, df_filtered)
 
 # 2. Count participants based on bundle_name
-participant_counts = df_filtered.groupby('title')['email'].nunique().reset_index()
+participant_counts = df_filtered.groupby('title', observed=True)['learner_id'].nunique().reset_index()
 participant_counts.columns = ['title', 'jumlah_partisipan']
 
 # 3. Count users based on typology from the latest results
-typology_user_counts = latest_test_results.groupby('typology')['email'].nunique().reset_index()
+typology_user_counts = latest_test_results.groupby('typology', observed=True)['learner_id'].nunique().reset_index()
 typology_user_counts.columns = ['typology', 'jumlah']
 
 # 4. Get unique Test Name for each bundle_name
 test_names = df_filtered[['title', 'Test Name']].drop_duplicates()
 
 # 5. Get all unique typology results for each Test Name
-typology_results = latest_test_results.groupby(['Test Name', 'typology'])['email'].nunique().reset_index()
+typology_results = latest_test_results.groupby(['Test Name', 'typology'], observed=True)['learner_id'].nunique().reset_index()
 typology_results.columns = ['Test Name', 'typology', 'jumlah']
 
 # 6. Calculate percentages for each typology per Test Name
-total_users_per_test = typology_results.groupby('Test Name')['jumlah'].transform('sum')
+total_users_per_test = typology_results.groupby('Test Name', observed=True)['jumlah'].transform('sum')
 typology_results['persentase'] = (typology_results['jumlah'] / total_users_per_test * 100).round(2)
 
 # 7. Combine results into one DataFrame
 result_df = pd.merge(participant_counts, test_names, on='title', how='left')
 result_df = pd.merge(result_df, typology_results, on='Test Name', how='left')
 
-# 8. Add rows for Overall ELITE based on filtered results
-final_results_elite = latest_test_results[latest_test_results['title'] == 'ELITE'].groupby('final_result')['email'].nunique().reset_index()
-overall_elite_rows = [{
-    'title': 'ELITE',
-    'jumlah_partisipan': participant_counts.loc[participant_counts['title'] == 'ELITE', 'jumlah_partisipan'].values[0],
-    'Test Name': 'Overall ELITE',
-    'typology': row['final_result'],
-    'jumlah': row['email'],
-    'persentase': (row['email'] / participant_counts.loc[participant_counts['title'] == 'ELITE', 'jumlah_partisipan'].values[0] * 100).round(2)
-} for _, row in final_results_elite.iterrows()]
-
-overall_elite_df = pd.DataFrame(overall_elite_rows)
-
-# 9. Add rows for Overall LEAN based on filtered results
-final_results_lean = latest_test_results[latest_test_results['title'] == 'LEAN'].groupby('final_result')['email'].nunique().reset_index()
-overall_lean_rows = [{
-    'title': 'LEAN',
-    'jumlah_partisipan': participant_counts.loc[participant_counts['title'] == 'LEAN', 'jumlah_partisipan'].values[0],
-    'Test Name': 'Overall LEAN',
-    'typology': row['final_result'],
-    'jumlah': row['email'],
-    'persentase': (row['email'] / participant_counts.loc[participant_counts['title'] == 'LEAN', 'jumlah_partisipan'].values[0] * 100).round(2)
-} for _, row in final_results_lean.iterrows()]
-
-overall_lean_df = pd.DataFrame(overall_lean_rows)
-
-# 10. Combine result_df with overall_elite_df and overall_lean_df
-result_df = pd.concat([result_df, overall_elite_df, overall_lean_df], ignore_index=True)
+# 8-10. Add "Overall ELITE" and "Overall LEAN" rows based on filtered results, both in one grouped pass
+overall_df = overall_final_results(latest_test_results, participant_counts, ['ELITE', 'LEAN'])
+result_df = pd.concat([result_df, overall_df], ignore_index=True) if len(overall_df) else result_df
 
 # 11. Filter for desired bundles: GI, ELITE, LEAN
 filtered_bundles = ['GI', 'ELITE', 'LEAN']
@@ -228,7 +178,7 @@ st.subheader(f"{selected_bundle} Traits Summary for {selected_layers_title} ({se
 st.dataframe(combined_result_df.drop(columns=['sort_order']))
 
 # Menghitung total pengguna untuk setiap Test Name
-total_users_per_test = combined_result_df.groupby('Test Name')['jumlah'].transform('sum')
+total_users_per_test = combined_result_df.groupby('Test Name', observed=True)['jumlah'].transform('sum')
 
 # Menghitung persentase untuk setiap typology pada masing-masing Test Name
 combined_result_df['persentase'] = (combined_result_df['jumlah'] / total_users_per_test * 100).round(2)
@@ -264,17 +214,17 @@ st.altair_chart(stacked_bar_chart, use_container_width=True)
 genuine_filtered = df_filtered[df_filtered['title'] == 'Genuine']
 
 # Get the highest scores
-highest_scores = genuine_filtered.loc[genuine_filtered.groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()]
+highest_scores = rows_in(best_scores, genuine_filtered)
 
 # Select relevant columns for the genuine active learners data
-genuine_active_learners_data = highest_scores[['name', 'email', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']]
+genuine_active_learners_data = highest_scores[['name', 'email', 'learner_id', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']]
 
 genuine_active_learners_data = genuine_active_learners_data.copy()
 
 # Add a rank column from 1 to 9 based on total_score for each Customer ID and Test Date
 genuine_active_learners_data.loc[:, 'rank'] = genuine_active_learners_data.groupby(
-    ['Customer ID', 'last_updated']
-)['total_score'].rank(ascending=False, method='first').astype(int)
+    ['Customer ID', 'last_updated'], observed=True, dropna=False
+)['total_score'].rank(ascending=False, method='first', na_option='bottom').astype(int)
 
 # Filter ranks from 1 to 9
 genuine_active_learners_data = genuine_active_learners_data[genuine_active_learners_data['rank'] <= 9]
@@ -286,19 +236,19 @@ selected_rank = st.selectbox("Select Rank", options=range(1, 10), index=0)
 filtered_data_by_rank = genuine_active_learners_data[genuine_active_learners_data['rank'] == selected_rank]
 
 # Get the latest Test Date results for each email
-latest_results = filtered_data_by_rank.loc[filtered_data_by_rank.groupby('email')['last_updated'].idxmax()]
+latest_results = filtered_data_by_rank.loc[filtered_data_by_rank.groupby('email', observed=True)['last_updated'].idxmax()]
 
 # Calculate jumlah_partisipan (total unique email for the bundle)
-total_participants = latest_results['email'].nunique()
+total_participants = latest_results['learner_id'].nunique()
 
 st.subheader(f"Genuine TOP {selected_rank} Traits Summary for {selected_layers_title} ({selected_units_title})")
 
 # Prepare the data for display
 summary_data = (
     latest_results
-    .groupby(['title', 'Test Name'])  # Group by bundle_name and Test Name
+    .groupby(['title', 'Test Name'], observed=True)  # Group by bundle_name and Test Name
     .agg(
-        jumlah_partisipan=('email', 'nunique'),  # Count of unique email based only on Test Name
+        jumlah_partisipan=('learner_id', 'nunique'),  # Count of unique email based only on Test Name
         jumlah=('email', 'count')  # Count of total entries based on email per Test Name
     )
     .reset_index()
@@ -330,17 +280,17 @@ st.altair_chart(bar_chart, use_container_width=True)
 astaka_filtered = df_filtered[df_filtered['title'] == 'Astaka']
 
 # Get the highest scores
-highest_scores = astaka_filtered.loc[astaka_filtered.groupby(['email', 'last_updated', 'Test Name'])['total_score'].idxmax()]
+highest_scores = rows_in(best_scores, astaka_filtered)
 
 # Select relevant columns for the genuine active learners data
-astaka_active_learners_data = highest_scores[['name', 'email', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']]
+astaka_active_learners_data = highest_scores[['name', 'email', 'learner_id', 'Customer ID', 'title', 'last_updated', 'Test Name', 'total_score', 'final_result']]
 
 astaka_active_learners_data = astaka_active_learners_data.copy()
 
 # Add a rank column from 1 to 6 based on total_score for each Customer ID and Test Date
 astaka_active_learners_data.loc[:, 'rank'] = astaka_active_learners_data.groupby(
-    ['Customer ID', 'last_updated']
-)['total_score'].rank(ascending=False, method='first').astype(int)
+    ['Customer ID', 'last_updated'], observed=True, dropna=False
+)['total_score'].rank(ascending=False, method='first', na_option='bottom').astype(int)
 
 # Filter ranks from 1 to 6
 astaka_active_learners_data = astaka_active_learners_data[astaka_active_learners_data['rank'] <= 6]
@@ -352,17 +302,17 @@ selected_rank = st.selectbox("Select Rank", options=range(1, 7), index=0)
 filtered_data_by_rank = astaka_active_learners_data[astaka_active_learners_data['rank'] == selected_rank]
 
 # Get the latest Test Date results for each email
-latest_results = filtered_data_by_rank.loc[filtered_data_by_rank.groupby('email')['last_updated'].idxmax()]
+latest_results = filtered_data_by_rank.loc[filtered_data_by_rank.groupby('email', observed=True)['last_updated'].idxmax()]
 
 # Calculate jumlah_partisipan (total unique email for the bundle)
-total_participants = latest_results['email'].nunique()
+total_participants = latest_results['learner_id'].nunique()
 
 # Prepare the data for display
 summary_data = (
     latest_results
-    .groupby(['title', 'Test Name'])  # Group by bundle_name and Test Name
+    .groupby(['title', 'Test Name'], observed=True)  # Group by bundle_name and Test Name
     .agg(
-        jumlah_partisipan=('email', 'nunique'),  # Count of unique email based only on Test Name
+        jumlah_partisipan=('learner_id', 'nunique'),  # Count of unique email based only on Test Name
         jumlah=('email', 'count')  # Count of total entries based on email per Test Name
     )
     .reset_index()
@@ -40,4 +40,6 @@ LEFT JOIN provinces p ON
     c.province_id = p.id
 LEFT JOIN institutions i ON
     c.institution_id = i.id
+WHERE 1 = 1
+    /* filters */  -- optional predicates are inserted here by fetch_data.render_query
 ORDER BY title ASC, u.name ASC, ubr.created_at DESC, ur.total_score DESC;
@@ -2,6 +2,7 @@ SELECT
     u.name, 
     u.email, 
     u.created_at AS 'created_at',
+    ur.created_at AS 'result_created_at',  -- incremental sync watermark, dropped by data_processing.fetch_discovery_au_data
     'Discovery' AS platform,  -- Menambahkan kolom platform dengan nilai 'Discovery'
     CASE 
         WHEN ubr.created_at IS NOT NULL THEN 'Active'  -- Jika terdapat Test Date maka status Active
@@ -14,4 +15,6 @@ LEFT JOIN user_bundle_result_user_result ubrur ON
     ur.id = ubrur.user_result_id
 LEFT JOIN user_bundle_results ubr ON 
     ubrur.user_bundle_result_id = ubr.id
+WHERE 1 = 1
+    /* filters */  -- optional predicates are inserted here by fetch_data.render_query
 ORDER BY u.name ASC, u.created_at DESC;
@@ -0,0 +1,43 @@
+SELECT  
+    u.email, 
+    u.name, 
+    u.phone,
+    u.created_at AS register_date,
+    ubr.created_at AS test_date,
+    CASE 
+        WHEN ubr.bundle_id = 1 THEN 'GI'
+        WHEN ubr.bundle_id = 2 THEN 'LEAN'
+        WHEN ubr.bundle_id = 3 THEN 'ELITE'
+        WHEN ubr.bundle_id = 4 THEN 'Genuine'
+        WHEN ubr.bundle_id = 5 THEN 'Astaka'
+    END AS bundle_name,
+    t.name AS test_name,
+    ur.test_result_attribute->>'$[0].name' AS typology,
+    ur.total_score,
+    LEFT(ur.total_score, 2) AS total_score_prefix,  -- dua angka pertama, seperti di query_DiscoveryAL.sql
+    ubr.result_name AS final_result,
+    p.name AS province,
+    i.name AS institution,
+    c.last_education,
+    c.id AS customer_id,
+    c.date_of_birth,
+    c.company,
+    c.gender
+FROM user_results ur
+LEFT JOIN tests t ON
+    ur.test_id = t.id
+JOIN users u ON 
+    ur.user_id = u.id
+JOIN user_bundle_result_user_result ubrur ON 
+    ur.id = ubrur.user_result_id
+JOIN user_bundle_results ubr ON 
+    ubrur.user_bundle_result_id = ubr.id
+LEFT JOIN customers c ON
+    u.id = c.user_id
+LEFT JOIN provinces p ON
+    c.province_id = p.id
+LEFT JOIN institutions i ON
+    c.institution_id = i.id
+WHERE 1 = 1
+    /* filters */  -- optional predicates are inserted here by fetch_data.render_query
+ORDER BY bundle_name ASC, u.name ASC, ubr.created_at DESC, ur.total_score DESC;
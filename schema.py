@@ -0,0 +1,132 @@
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Declared type of every column the dashboard reads, by column name (the same name means
+# the same thing in every frame). Missing values are real nulls (NaN/NaT) everywhere
+# except in label and dimension columns, where 'N/A' is a value the pages filter and group on.
+#   'date'      datetime64, truncated to the day
+#   'datetime'  datetime64
+#   'number'    float32
+#   'text'      str
+#   'label'     str with 'N/A' for missing values
+#   'dimension' a label stored as a categorical by the builders
+COLUMN_TYPES = {
+    'last_updated': 'date',
+    'created_at': 'date',
+    'scheduled_at': 'date',
+    'done_at': 'date',
+    'date_of_birth': 'date',
+    'Register Date': 'datetime',
+    'Test Date': 'datetime',
+    'total_score': 'number',
+    'duration': 'number',
+    'Customer ID': 'text',
+    'nik': 'text',
+    'phone': 'text',
+    'platform': 'dimension',
+    'title': 'dimension',
+    'unit': 'dimension',
+    'subunit': 'dimension',
+    'layer': 'dimension',
+    'layer_group': 'dimension',
+    'generation': 'dimension',
+    'gender': 'dimension',
+    'typology': 'dimension',
+    'final_result': 'label',
+    'Test Name': 'dimension',
+    'status_learner': 'dimension',
+    'learner_status': 'dimension',
+    'Company': 'dimension',
+    'institution': 'dimension',
+    'last_education': 'label',
+    'Province': 'dimension',
+    'tenure': 'label',
+}
+
+DIMENSION_COLUMNS = [column for column, kind in COLUMN_TYPES.items() if kind == 'dimension']
+
+# Format date strings are parsed with; 'ISO8601' accepts 2024-01-31 with or without a time.
+# Values the database already returns as dates/datetimes aren't parsed at all.
+DATE_FORMATS = {
+    'done_at': '%Y-%m-%d',
+}
+DEFAULT_DATE_FORMAT = 'ISO8601'
+
+# Cell values that mean "no value" in the sources
+EMPTY_VALUES = ['', '#VALUE!']
+
+MISSING_LABEL = 'N/A'
+
+
+def apply_schema(df):
+    """A copy of ``df`` with its declared columns converted to their COLUMN_TYPES type.
+
+    Empty cells become nulls; values that don't parse as the declared type become nulls
+    as well instead of turning the whole column into strings. Undeclared columns only
+    get their empty cells replaced.
+    """
+    df = df.mask(df.isin(EMPTY_VALUES))
+    for column in df.columns:
+        kind = COLUMN_TYPES.get(column)
+        if kind is not None:
+            df[column] = _convert(df[column], kind, DATE_FORMATS.get(column, DEFAULT_DATE_FORMAT))
+    return df
+
+
+def parse_dates(series, date_format=DEFAULT_DATE_FORMAT):
+    """``series`` as datetime64, parsing its strings with ``date_format``; anything unparseable becomes NaT.
+
+    The number of values that became NaT that way is logged as a warning.
+    """
+    if pd.api.types.is_datetime64_dtype(series.dtype):
+        return series
+    is_text = series.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    if not is_text.any():
+        parsed = pd.to_datetime(series, errors='coerce')
+    else:
+        # Strings go through the explicit format instead of pandas guessing one per value
+        parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+        parsed[is_text] = pd.to_datetime(series[is_text], format=date_format, errors='coerce')
+        if not is_text.all():
+            parsed[~is_text] = pd.to_datetime(series[~is_text], errors='coerce')
+    unparseable = int((parsed.isna() & series.notna()).sum())
+    if unparseable:
+        logger.warning("%d values of column '%s' couldn't be parsed as dates (format %s) and became NaT",
+                       unparseable, series.name, date_format)
+    return parsed
+
+
+def _convert(series, kind, date_format):
+    if kind in ('date', 'datetime'):
+        series = parse_dates(series, date_format)
+        return series.dt.normalize() if kind == 'date' else series
+    if kind == 'number':
+        return pd.to_numeric(series, errors='coerce').astype('float32')
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    # Numbers read from a sheet or the database are written as they appear there (1234, not 1234.0)
+    text = series.map(_as_text, na_action='ignore').astype(object)
+    return text.fillna(MISSING_LABEL) if kind in ('label', 'dimension') else text
+
+
+def _as_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def for_display(df):
+    """``df`` as shown in a table: nulls as 'N/A' and day-only dates without a time."""
+    df = df.copy()
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_datetime64_dtype(series.dtype):
+            if (series.dropna() == series.dropna().dt.normalize()).all():
+                df[column] = series.dt.date.astype(object).where(series.notna(), MISSING_LABEL)
+        elif isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+            if series.isna().any():
+                df[column] = series.astype(object).fillna(MISSING_LABEL)
+    return df
@@ -0,0 +1,225 @@
+import csv
+import os
+import threading
+from collections import namedtuple
+
+import pandas as pd
+from gspread.utils import numericise
+
+# Header row of each worksheet seen so far, keyed by (spreadsheet id, worksheet title)
+_headers = {}
+_headers_lock = threading.Lock()
+
+
+def read_worksheets(spreadsheet, requests):
+    """Read several worksheets of ``spreadsheet`` into DataFrames with one batchGet request.
+
+    ``requests`` is a list of ``(worksheet index, columns)``; ``columns`` lists the header
+    names to keep, or None for every column. Only the needed column ranges are
+    downloaded, column-major, and each column is numericised like get_all_records does,
+    so the frames match ``pd.DataFrame(sheet.get_all_records())[columns]`` (except that
+    rows at the bottom of the sheet that are blank in every kept column are dropped).
+
+    Column positions are looked up from the header rows, fetched in one extra request
+    the first time a worksheet is read and re-checked against the header cells that come
+    back with every read; if the layout changed they are fetched again.
+    """
+    titles = [worksheet.title for worksheet in spreadsheet.worksheets()]
+    requests = [(titles[index], columns) for index, columns in requests]
+    frames = _read_columns(spreadsheet, requests, refresh_headers=False)
+    if frames is None:
+        frames = _read_columns(spreadsheet, requests, refresh_headers=True)
+    return frames
+
+
+def _read_columns(spreadsheet, requests, refresh_headers):
+    """Frames for ``requests`` given as ``(title, columns)``, or None if a cached header row is stale."""
+    layouts = _header_rows(spreadsheet, [title for title, columns in requests if columns is not None], refresh_headers)
+
+    ranges = []
+    plans = []
+    for title, columns in requests:
+        if columns is None:
+            plans.append((title, None, None, len(ranges)))
+            ranges.append(quote_title(title))
+            continue
+        headers = layouts[title]
+        missing = [column for column in columns if column not in headers]
+        if missing:
+            raise KeyError(f"{missing} not in the header row of worksheet '{title}'")
+        runs = _contiguous_runs(sorted(headers.index(column) for column in columns))
+        plans.append((title, columns, runs, len(ranges)))
+        ranges.extend(f'{quote_title(title)}!{column_letter(start)}:{column_letter(end)}' for start, end in runs)
+
+    response = spreadsheet.values_batch_get(ranges, params={'majorDimension': 'COLUMNS'})
+    value_ranges = [value_range.get('values', []) for value_range in response['valueRanges']]
+
+    frames = []
+    for title, columns, runs, first_range in plans:
+        if columns is None:
+            frames.append(_columns_to_frame(title, value_ranges[first_range]))
+            continue
+        # Map each requested header to the column array that came back for it
+        headers = layouts[title]
+        arrays = {}
+        for range_index, (start, end) in enumerate(runs, first_range):
+            returned = value_ranges[range_index]
+            for offset in range(end - start + 1):
+                values = returned[offset] if offset < len(returned) else []
+                name = headers[start + offset]
+                if (values[0] if values else '') != name:
+                    return None
+                arrays[name] = values[1:]
+        frames.append(_arrays_to_frame({column: arrays[column] for column in columns}))
+    return frames
+
+
+def _header_rows(spreadsheet, titles, refresh):
+    """Header row of each worksheet in ``titles``, fetching the unknown (or all, if ``refresh``) ones in one request."""
+    spreadsheet_id = getattr(spreadsheet, 'id', None)
+    with _headers_lock:
+        known = {} if refresh else {title: _headers[(spreadsheet_id, title)] for title in titles if (spreadsheet_id, title) in _headers}
+    unknown = [title for title in dict.fromkeys(titles) if title not in known]
+    if unknown:
+        response = spreadsheet.values_batch_get([f'{quote_title(title)}!1:1' for title in unknown])
+        with _headers_lock:
+            for title, value_range in zip(unknown, response['valueRanges']):
+                rows = value_range.get('values', [])
+                known[title] = _headers[(spreadsheet_id, title)] = list(rows[0]) if rows else []
+    return known
+
+
+def _columns_to_frame(title, columns):
+    if max((len(column) for column in columns), default=0) <= 1:
+        # get_all_records returns no records for a blank or header-only worksheet
+        return pd.DataFrame()
+    headers = [column[0] if column else '' for column in columns]
+    duplicates = sorted({header for header in headers if headers.count(header) > 1})
+    if duplicates:
+        raise ValueError(f"The header row of worksheet '{title}' contains duplicates: {duplicates}")
+    return _arrays_to_frame({header: column[1:] for header, column in zip(headers, columns)})
+
+
+def _arrays_to_frame(arrays):
+    # The API trims trailing blank cells from every column; pad them back like get_all_records does
+    row_count = max((len(values) for values in arrays.values()), default=0)
+    if row_count == 0:
+        return pd.DataFrame(columns=list(arrays))
+    return pd.DataFrame({
+        name: [numericise(value) for value in values] + [''] * (row_count - len(values))
+        for name, values in arrays.items()
+    })
+
+
+def _contiguous_runs(positions):
+    """``[(start, end), ...]`` for the runs of consecutive column positions in ``positions``."""
+    runs = []
+    for position in positions:
+        if runs and position == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], position)
+        else:
+            runs.append((position, position))
+    return runs
+
+
+def column_letter(position):
+    """A1 letter of the 0-based column ``position`` (0 -> A, 26 -> AA)."""
+    letters = ''
+    position += 1
+    while position:
+        position, remainder = divmod(position - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def column_position(letters):
+    position = 0
+    for letter in letters:
+        position = position * 26 + ord(letter.upper()) - ord('A') + 1
+    return position - 1
+
+
+def quote_title(title):
+    return "'" + title.replace("'", "''") + "'"
+
+
+LocalWorksheet = namedtuple('LocalWorksheet', ['title', 'index'])
+
+
+class LocalSpreadsheet:
+    """Stand-in for a gspread Spreadsheet backed by in-memory rows, for offline use.
+
+    Implements just the calls read_worksheets and the freshness checks make, following
+    the Sheets API's behaviour: values are strings and trailing blank cells and rows
+    are left out of every range.
+    """
+
+    def __init__(self, sheets, id='local', modified='1970-01-01T00:00:00.000Z'):
+        # sheets: worksheet title -> list of rows (lists of cell strings), in worksheet order
+        self.id = id
+        self._sheets = {title: [[str(cell) for cell in row] for row in rows] for title, rows in sheets.items()}
+        self._modified = modified
+        self.batch_get_calls = 0
+
+    @classmethod
+    def from_csv_dir(cls, directory):
+        """One worksheet per ``*.csv`` file in ``directory``, ordered by file name."""
+        sheets = {}
+        # Like Drive's modifiedTime, this changes whenever any worksheet is edited
+        modified_at = os.path.getmtime(directory)
+        for file_name in sorted(os.listdir(directory)):
+            if file_name.endswith('.csv'):
+                path = os.path.join(directory, file_name)
+                with open(path, newline='') as csv_file:
+                    sheets[file_name[:-len('.csv')]] = list(csv.reader(csv_file))
+                modified_at = max(modified_at, os.path.getmtime(path))
+        modified = pd.Timestamp(modified_at, unit='s', tz='UTC').isoformat()
+        return cls(sheets, id=os.path.abspath(directory), modified=modified)
+
+    def worksheets(self):
+        return [LocalWorksheet(title, index) for index, title in enumerate(self._sheets)]
+
+    def get_lastUpdateTime(self):
+        return self._modified
+
+    def values_batch_get(self, ranges, params=None):
+        self.batch_get_calls += 1
+        major_dimension = (params or {}).get('majorDimension', 'ROWS')
+        return {'valueRanges': [self._value_range(a1_range, major_dimension) for a1_range in ranges]}
+
+    def _value_range(self, a1_range, major_dimension):
+        # Ranges are either a quoted title alone or 'Title'!<cells>
+        if a1_range.endswith("'"):
+            title, cells = a1_range, ''
+        else:
+            title, _, cells = a1_range.rpartition('!')
+        rows = self._sheets[title[1:-1].replace("''", "'")]
+        width = max((len(row) for row in rows), default=0)
+        first_row, last_row, first_column, last_column = 0, len(rows) - 1, 0, width - 1
+        if cells:
+            start, _, end = cells.partition(':')
+            if start.isdigit():
+                first_row, last_row = int(start) - 1, int(end) - 1
+            else:
+                first_column, last_column = column_position(start), column_position(end)
+        grid = [
+            [row[column] if column < len(row) else '' for column in range(first_column, last_column + 1)]
+            for row in rows[first_row:last_row + 1]
+        ]
+        if major_dimension == 'COLUMNS':
+            grid = [list(column) for column in zip(*grid)]
+        # The API leaves out trailing blank cells and then trailing empty rows/columns
+        grid = [_rstrip(line) for line in grid]
+        while grid and not grid[-1]:
+            grid.pop()
+        value_range = {'range': a1_range, 'majorDimension': major_dimension}
+        if grid:
+            value_range['values'] = grid
+        return value_range
+
+
+def _rstrip(cells):
+    cells = list(cells)
+    while cells and cells[-1] == '':
+        cells.pop()
+    return cells
@@ -0,0 +1,158 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEFAULT_SNAPSHOT_DIR = '.snapshots'
+
+
+def save_snapshot(name, df, meta=None, directory=DEFAULT_SNAPSHOT_DIR):
+    """Write ``df`` and its metadata as ``<directory>/<name>.parquet`` and ``<name>.json``.
+
+    Both files are written to temporary paths first and moved into place, so a reader
+    never sees a half-written snapshot.
+    """
+    os.makedirs(directory, exist_ok=True)
+    table = frame_to_arrow(df)
+    _atomic_write(os.path.join(directory, f'{name}.parquet'), lambda path: pq.write_table(table, path))
+
+    def write_meta(path):
+        with open(path, 'w') as meta_file:
+            json.dump(meta or {}, meta_file, default=str)
+
+    _atomic_write(os.path.join(directory, f'{name}.json'), write_meta)
+
+
+def load_snapshot(name, directory=DEFAULT_SNAPSHOT_DIR):
+    """Return ``(df, meta)`` for a stored snapshot, or ``(None, None)`` if there is none."""
+    data_path = os.path.join(directory, f'{name}.parquet')
+    meta_path = os.path.join(directory, f'{name}.json')
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None, None
+    with open(meta_path) as meta_file:
+        meta = json.load(meta_file)
+    return frame_from_arrow(pq.read_table(data_path)), meta
+
+
+def save_frames(name, frames, meta=None, directory=DEFAULT_SNAPSHOT_DIR, keep=2):
+    """Write ``frames`` (frame name -> DataFrame) as a new version of the ``name`` bundle.
+
+    Each frame is an Arrow IPC file so it can be memory-mapped on load. The version is
+    written to a staging directory and published by atomically replacing the bundle's
+    ``CURRENT`` pointer; only the newest ``keep`` versions are kept. Returns the version.
+    """
+    root = os.path.join(directory, name)
+    os.makedirs(root, exist_ok=True)
+    version = time.strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:8]
+    staging = tempfile.mkdtemp(dir=root, prefix='.tmp-')
+    try:
+        for frame_name, df in frames.items():
+            table = frame_to_arrow(df)
+            with pa.OSFile(os.path.join(staging, f'{frame_name}.arrow'), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        with open(os.path.join(staging, 'meta.json'), 'w') as meta_file:
+            json.dump({**(meta or {}), 'version': version, 'frames': list(frames)}, meta_file, default=str)
+        os.rename(staging, os.path.join(root, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    def write_pointer(path):
+        with open(path, 'w') as pointer_file:
+            pointer_file.write(version)
+
+    _atomic_write(os.path.join(root, 'CURRENT'), write_pointer)
+    _prune_versions(root, keep, version)
+    return version
+
+
+def load_frames_meta(name, directory=DEFAULT_SNAPSHOT_DIR):
+    """Return the metadata of the current version of the ``name`` bundle, or None."""
+    version_dir = _current_version_dir(name, directory)
+    if version_dir is None:
+        return None
+    with open(os.path.join(version_dir, 'meta.json')) as meta_file:
+        return json.load(meta_file)
+
+
+def load_frames(name, directory=DEFAULT_SNAPSHOT_DIR, frame_names=None):
+    """Memory-map the current version of the ``name`` bundle.
+
+    Returns ``(frames, meta)`` with only ``frame_names`` loaded if given, or
+    ``(None, None)`` if the bundle has never been written.
+    """
+    version_dir = _current_version_dir(name, directory)
+    if version_dir is None:
+        return None, None
+    with open(os.path.join(version_dir, 'meta.json')) as meta_file:
+        meta = json.load(meta_file)
+    frames = {}
+    for frame_name in frame_names or meta['frames']:
+        with pa.memory_map(os.path.join(version_dir, f'{frame_name}.arrow'), 'r') as source:
+            frames[frame_name] = frame_from_arrow(pa.ipc.open_file(source).read_all())
+    return frames, meta
+
+
+def frame_to_arrow(df):
+    """Convert ``df`` to an Arrow table.
+
+    Object columns Arrow can't hold as a single type, such as undeclared columns mixing
+    numbers and strings, are stored as strings with their nulls kept. Snapshots only ever
+    hold plain Arrow data, so loading one never unpickles anything from the (possibly
+    shared) snapshot directory. Raises ValueError for any other column Arrow can't store.
+    """
+    columns = {}
+    for name in df.columns:
+        try:
+            columns[name] = pa.array(df[name], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as error:
+            if df[name].dtype != object:
+                raise ValueError(f"Column '{name}' of type {df[name].dtype} can't be stored in a snapshot") from error
+            columns[name] = pa.array(df[name].map(str, na_action='ignore'), type=pa.string(), from_pandas=True)
+    return pa.table(columns)
+
+
+def frame_from_arrow(table):
+    return table.to_pandas()
+
+
+def _current_version_dir(name, directory):
+    root = os.path.join(directory, name)
+    try:
+        with open(os.path.join(root, 'CURRENT')) as pointer_file:
+            version = pointer_file.read().strip()
+    except FileNotFoundError:
+        return None
+    version_dir = os.path.join(root, version)
+    return version_dir if os.path.isdir(version_dir) else None
+
+
+def _prune_versions(root, keep, current):
+    versions = sorted(
+        (
+            entry for entry in os.listdir(root)
+            if entry != current and not entry.startswith('.') and os.path.isdir(os.path.join(root, entry))
+        ),
+        key=lambda entry: os.path.getmtime(os.path.join(root, entry)),
+    )
+    for stale in versions[:max(0, len(versions) - (keep - 1))]:
+        shutil.rmtree(os.path.join(root, stale), ignore_errors=True)
+
+
+def _atomic_write(path, write):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# A cached source value; ``version`` changes whenever ``value`` is refetched
+SourceEntry = namedtuple('SourceEntry', ['value', 'version', 'fingerprint', 'checked_at', 'fetched_at'])
+
+
+class SourceCache:
+    """In-process cache of source frames, each revalidated on its own schedule.
+
+    Every source is registered with a ``fetch`` callable, a cheap ``fingerprint``
+    callable (e.g. max timestamp and row count, or a spreadsheet revision) and a
+    ``ttl``. Within the TTL the cached value is served as is; after it, the fingerprint
+    is recomputed and the source is only refetched if the fingerprint changed, or if
+    the value is older than ``max_age``. A source computed from another one ``follows``
+    it instead: its fingerprint is that source's version. Derived frames are memoized
+    on the versions of their inputs, so they are only rebuilt when one of those inputs
+    actually changed.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._entries = {}
+        self._derived = {}
+        self._locks = {}
+        self._followers = set()
+        self._versions = 0
+        self._lock = threading.Lock()
+
+    def register(self, name, fetch, fingerprint=None, ttl=300, max_age=24 * 3600, follows=None):
+        if follows is not None:
+            fingerprint = lambda: self.get_versioned(follows)[0]
+            self._followers.add(name)
+        self._sources[name] = (fetch, fingerprint, ttl, max_age)
+        self._locks[name] = threading.Lock()
+
+    @property
+    def names(self):
+        return list(self._sources)
+
+    def get(self, name):
+        return self.get_versioned(name)[1]
+
+    def get_versioned(self, name):
+        """Return ``(version, value)`` for a source, refetching it only if it changed."""
+        fetch, fingerprint, ttl, max_age = self._sources[name]
+        with self._locks[name]:
+            entry = self._entries.get(name)
+            now = time.time()
+            if entry is not None and now - entry.checked_at < ttl:
+                return entry.version, entry.value
+
+            current = None
+            if fingerprint is not None:
+                try:
+                    current = fingerprint()
+                except Exception:
+                    if entry is None:
+                        raise
+                    logger.exception("Fingerprint of source '%s' failed, serving the cached value", name)
+                    return entry.version, entry.value
+
+            if (entry is not None and current is not None and current == entry.fingerprint
+                    and now - entry.fetched_at < max_age):
+                self._entries[name] = entry._replace(checked_at=now)
+                return entry.version, entry.value
+
+            value = fetch()
+            entry = SourceEntry(value, self._next_version(), current, now, now)
+            self._entries[name] = entry
+            return entry.version, entry.value
+
+    def fingerprints(self):
+        """Fingerprint each cached source was fetched or last checked at, by name.
+
+        Sources that follow another one are left out: their fingerprints are versions,
+        which only mean something within this process.
+        """
+        return {name: entry.fingerprint for name, entry in self._entries.items() if name not in self._followers}
+
+    def derive(self, name, inputs, build):
+        """Return ``build(*values)`` for ``inputs`` given as ``(version, value)`` pairs.
+
+        The result is memoized under ``name`` and rebuilt only when the input versions
+        differ from the ones it was built from.
+        """
+        versions = tuple(version for version, _ in inputs)
+        memo = self._derived.get(name)
+        if memo is not None and memo[0] == versions:
+            return memo[1]
+        value = build(*(value for _, value in inputs))
+        self._derived[name] = (versions, value)
+        return value
+
+    def derived_versions(self, name):
+        """Input versions the memoized ``name`` value was built from, or None."""
+        memo = self._derived.get(name)
+        return memo[0] if memo is not None else None
+
+    def invalidate(self, name=None):
+        """Force the named source (or every source) to be refetched on its next use."""
+        for source in [name] if name is not None else self.names:
+            with self._locks[source]:
+                self._entries.pop(source, None)
+
+    def revalidate(self, name=None):
+        """Re-check the fingerprint of the named source (or every source) on its next use."""
+        for source in [name] if name is not None else self.names:
+            with self._locks[source]:
+                entry = self._entries.get(source)
+                if entry is not None:
+                    self._entries[source] = entry._replace(checked_at=0)
+
+    def _next_version(self):
+        with self._lock:
+            self._versions += 1
+            return self._versions
@@ -0,0 +1,128 @@
+"""Timings of the dashboard's data structures against the per-row / per-rerun paths they replace.
+
+Run from the repository root with ``python -m tests.bench``. The tests next to this file
+check that each fast path gives the same results; this script only measures them.
+"""
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_holder import DatasetHolder
+from distinct_counts import DailyDistinctCounts, SketchedDistinctCounts
+from filter_index import FilterIndex
+from normalization import clean_company, normalize_gender
+
+
+def timed(function, repeat=1):
+    """``(result of the last call, mean seconds per call)`` of calling ``function`` ``repeat`` times."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def learner_frame(rows, seed=0, learners=50_000, days=600):
+    """A synthetic merged-like frame: one row per result, with the columns the pages filter and count on."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'learner_id': rng.integers(0, learners, rows),
+        'platform': pd.Categorical(rng.choice(['Discovery', 'Capture'], rows)),
+        'status_learner': pd.Categorical(rng.choice(['Internal', 'External'], rows)),
+        'unit': pd.Categorical(rng.choice([f'Unit {i}' for i in range(40)], rows)),
+        'title': pd.Categorical(rng.choice(['GI', 'LEAN', 'ELITE', 'Genuine', 'Astaka'], rows)),
+        'Company': pd.Categorical(rng.choice([f'Company {i}' for i in range(5_000)], rows)),
+        'created_at': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, days, rows), 'D'),
+        'total_score': rng.integers(1, 100, rows).astype('float32'),
+    })
+
+
+def normalize_gender_per_row(value):
+    """The per-row gender normalization finalize_data applied with .apply before normalization.py."""
+    value = str(value).strip().lower()
+    if value in ['male', 'laki-laki', 'laki - laki', 'pria', 'm']:
+        return 'Male'
+    elif value in ['female', 'perempuan', 'wanita', 'f']:
+        return 'Female'
+    else:
+        return 'n/a'
+
+
+def bench_normalization(rows=1_000_000):
+    rng = np.random.default_rng(0)
+    genders = pd.Series(rng.choice(['Male', 'perempuan', ' F', 'laki - laki', 'N/A', None, 'Wanita', 'pria'], rows))
+    companies = pd.Series(rng.choice(['KG', '-', 'NA', 'Gramedia', '0', 'N/a', 'Kompas', '.'], rows))
+    for name, per_row, table_driven in [
+        ('gender', lambda: genders.apply(normalize_gender_per_row), lambda: normalize_gender(genders)),
+        ('company', lambda: companies.replace(['-', '.', '0', 'n/a', 'N/a', 'NA'], 'N/A', regex=False), lambda: clean_company(companies)),
+    ]:
+        _, per_row_seconds = timed(per_row)
+        _, table_seconds = timed(table_driven)
+        print(f'normalization {name}: per-row {per_row_seconds:.3f}s, table-driven {table_seconds:.3f}s '
+              f'({per_row_seconds / table_seconds:.0f}x) on {rows:,} rows')
+
+
+def bench_held_frames(rows=500_000):
+    # Per-rerun cost of serving a frame: st.cache_data's pickle round trip against a held view
+    frame = learner_frame(rows)
+    holder = DatasetHolder(lambda name, version: None if version else ('v1', frame))
+    holder.get('merged')
+    _, pickled = timed(lambda: pickle.loads(pickle.dumps(frame)), repeat=5)
+    _, copied = timed(lambda: holder.get('merged'), repeat=5)
+    # As the app entry point sets it
+    with pd.option_context('mode.copy_on_write', True):
+        _, held = timed(lambda: holder.get('merged'), repeat=5)
+    print(f'held frames: pickle round trip {pickled * 1000:.1f}ms, held copy {copied * 1000:.1f}ms, '
+          f'held view {held * 1000:.3f}ms per rerun on {rows:,} rows')
+
+
+def bench_filter_index(rows=1_000_000):
+    # Sidebar filtering as chained boolean masks against one pass over the bitmaps
+    frame = learner_frame(rows)
+    selections = {
+        'platform': ['Discovery'], 'status_learner': ['Internal'], 'unit': ['Unit 1', 'Unit 2', 'Unit 3'],
+        'title': ['GI', 'LEAN'], 'Company': [f'Company {i}' for i in range(0, 5_000, 3)],
+    }
+
+    def masked():
+        filtered = frame
+        for column, values in selections.items():
+            filtered = filtered[filtered[column].isin(values)]
+        return filtered
+
+    index, built = timed(lambda: FilterIndex(frame, list(selections)))
+    _, mask_seconds = timed(masked, repeat=5)
+    result, index_seconds = timed(lambda: index.select(frame, selections), repeat=5)
+    print(f'filter index: chained masks {mask_seconds * 1000:.1f}ms, bitmaps {index_seconds * 1000:.1f}ms '
+          f'for {len(result):,} of {rows:,} rows (built in {built * 1000:.0f}ms)')
+
+
+def bench_distinct_counts(rows=500_000):
+    # Date-range KPI cost: filtering the frame and calling nunique against a table lookup or merged sketches
+    frame = learner_frame(rows, learners=60_000, days=700)
+    rng = np.random.default_rng(1)
+    groups = {'platform': frame['platform']}
+    counts, built = timed(lambda: DailyDistinctCounts(frame['created_at'], frame['learner_id'], groups))
+    _, table_built = timed(lambda: counts.count('2023-01-01', '2023-01-01', platform='Discovery'))
+    sketches, sketched = timed(lambda: SketchedDistinctCounts(frame['created_at'], frame['learner_id'], groups))
+
+    ranges = [sorted(pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 700, 2), 'D')) for _ in range(200)]
+    expected, filtered = timed(lambda: [
+        frame.loc[frame['created_at'].between(start, end) & (frame['platform'] == 'Discovery'), 'learner_id'].nunique()
+        for start, end in ranges
+    ])
+    _, looked_up = timed(lambda: [counts.count(start, end, platform='Discovery') for start, end in ranges])
+    approximate, merged = timed(lambda: [sketches.count(start, end, platform='Discovery') for start, end in ranges])
+    errors = np.abs(np.array(approximate) - expected) / np.maximum(expected, 1)
+    print(f'distinct counts per range: filter + nunique {filtered / len(ranges) * 1000:.2f}ms, '
+          f'table {looked_up / len(ranges) * 1000:.3f}ms (built in {(built + table_built) * 1000:.0f}ms), '
+          f'sketches {merged / len(ranges) * 1000:.2f}ms (built in {sketched * 1000:.0f}ms); '
+          f'sketch error mean {errors.mean():.2%}, max {errors.max():.2%} on {rows:,} rows')
+
+
+if __name__ == '__main__':
+    bench_normalization()
+    bench_held_frames()
+    bench_filter_index()
+    bench_distinct_counts()
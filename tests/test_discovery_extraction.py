@@ -0,0 +1,114 @@
+"""The single-query Discovery extraction must finalize to the same frames as the two separate queries.
+
+The real .sql files run against an in-memory SQLite copy of the Discovery tables, so the
+test needs no database access. SQLite has no LEFT() string function (LEFT is only a join
+keyword there), so that call is mapped to an equivalent function; the rest of the SQL
+runs as written.
+"""
+import json
+import re
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import data_processing as dp
+from fetch_data import DISCOVERY_RESULTS_QUERY, project_discovery, project_discovery_al, query_template
+
+SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT, name TEXT, phone TEXT, created_at TEXT);
+CREATE TABLE tests (id INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE user_results (id INTEGER PRIMARY KEY, user_id INTEGER, test_id INTEGER, test_result_attribute TEXT, total_score TEXT);
+CREATE TABLE user_bundle_results (id INTEGER PRIMARY KEY, bundle_id INTEGER, created_at TEXT, result_name TEXT);
+CREATE TABLE user_bundle_result_user_result (user_result_id INTEGER, user_bundle_result_id INTEGER);
+CREATE TABLE provinces (id INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE institutions (id INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE customers (
+    id INTEGER PRIMARY KEY, user_id INTEGER, province_id INTEGER, institution_id INTEGER,
+    last_education TEXT, date_of_birth TEXT, company TEXT, gender TEXT
+);
+"""
+
+USERS = [
+    (1, 'Ana@Example.com ', 'Ana', '0812', '2023-05-02 08:00:00'),
+    (2, 'budi@example.com', 'Budi', None, '2023-07-11 13:30:00'),
+    # No customers row: every customer column comes back NULL from the LEFT JOIN
+    (3, 'citra@example.com', 'Citra', '0813', '2023-08-20 10:00:00'),
+]
+CUSTOMERS = [
+    (17, 1, 1, 1, 'S1', '1995-03-04', 'KG', 'Female'),
+    (18, 2, None, 2, '', '1990-11-30', '-', 'laki-laki'),
+]
+TESTS = [(1, 'Learning Agility'), (2, 'Resilience'), (3, 'Growth Inventory')]
+# (id, bundle_id, created_at, result_name) and the user results each bundle result links
+BUNDLE_RESULTS = [
+    ((1, 2, '2024-01-15 09:12:00', 'Ready'), [(1, 1, 1, 'Adaptive', '85.50'), (2, 1, 2, 'Steady', '9')]),
+    ((2, 2, '2024-03-01 11:00:00', 'Developing'), [(3, 1, 1, 'Adaptive', '85.50'), (4, 1, 2, 'Steady', '85.50')]),
+    ((3, 1, '2024-02-03 10:45:00', None), [(5, 2, 3, 'Explorer', '100')]),
+    ((4, 5, '2024-02-10 16:20:00', 'Ready'), [(6, 3, 1, None, None), (7, 3, 2, 'Steady', '77')]),
+]
+
+
+def sqlite_sql(sql):
+    """``sql`` with MySQL's LEFT(text, n) calls renamed to the function SQLite gets below."""
+    return re.sub(r'\bLEFT\(', 'mysql_left(', sql)
+
+
+@pytest.fixture(scope='module')
+def discovery_db():
+    connection = sqlite3.connect(':memory:')
+    connection.create_function('mysql_left', 2, lambda text, length: None if text is None else str(text)[:length])
+    connection.executescript(SCHEMA)
+    connection.executemany('INSERT INTO users VALUES (?, ?, ?, ?, ?)', USERS)
+    connection.executemany('INSERT INTO customers VALUES (?, ?, ?, ?, ?, ?, ?, ?)', CUSTOMERS)
+    connection.executemany('INSERT INTO tests VALUES (?, ?)', TESTS)
+    connection.executemany('INSERT INTO provinces VALUES (?, ?)', [(1, 'DKI Jakarta')])
+    connection.executemany('INSERT INTO institutions VALUES (?, ?)', [(1, 'Universitas A'), (2, 'Universitas B')])
+    for bundle_result, user_results in BUNDLE_RESULTS:
+        connection.execute('INSERT INTO user_bundle_results VALUES (?, ?, ?, ?)', bundle_result)
+        for result_id, user_id, test_id, typology, score in user_results:
+            attributes = json.dumps([{'name': typology}]) if typology is not None else None
+            connection.execute('INSERT INTO user_results VALUES (?, ?, ?, ?, ?)', (result_id, user_id, test_id, attributes, score))
+            connection.execute('INSERT INTO user_bundle_result_user_result VALUES (?, ?)', (result_id, bundle_result[0]))
+    yield connection
+    connection.close()
+
+
+def run(connection, query_file):
+    return pd.read_sql_query(sqlite_sql(query_template(query_file)), connection)
+
+
+def canonical(df):
+    # Rows tied on every ORDER BY key have no defined order
+    return df.sort_values(list(df.columns), key=lambda column: column.astype(str), kind='mergesort').reset_index(drop=True)
+
+
+def finalized(df_discovery, df_discovery_al):
+    """The finalized discovery and merged frames built from the two Discovery source frames."""
+    df_sap = dp.apply_schema(pd.DataFrame({
+        'name_sap': ['Ana S'], 'email': ['ana@example.com'], 'nik': ['000123'], 'unit': ['Unit A'], 'subunit': ['S1'],
+        'admin_hr': ['hr'], 'layer': ['Group 1'], 'generation': ['Millenial'], 'gender': ['F'], 'division': ['d'],
+        'department': ['dep'], 'tenure': ['1-3'],
+    }))
+    df_capture_sheet1 = dp.fetch_capture_sheet_data(pd.DataFrame({
+        'name': ['Dewi'], 'email': ['dewi@example.com'], 'nik': [0], 'title': ['Course X'], 'last_updated': ['2024-01-20'],
+        'duration': [600], 'type': ['Course'], 'platform': ['Capture'], 'Company': ['KG'], 'institution': [''],
+    }))
+    discovery = dp.DATASETS['discovery'][1](dp.fetch_discovery_data(df_discovery))
+    merged = dp.build_merged(dp.fetch_discovery_al_data(df_discovery_al), df_capture_sheet1, dp.build_sap_index(df_sap))
+    return discovery, merged
+
+
+def test_projections_match_the_two_queries(discovery_db):
+    results = run(discovery_db, DISCOVERY_RESULTS_QUERY)
+    assert len(results) == sum(len(user_results) for _, user_results in BUNDLE_RESULTS)
+    pd.testing.assert_frame_equal(canonical(project_discovery(results)), canonical(run(discovery_db, 'query_discovery.sql')))
+    pd.testing.assert_frame_equal(canonical(project_discovery_al(results)), canonical(run(discovery_db, 'query_DiscoveryAL.sql')))
+
+
+def test_finalized_frames_match_the_two_queries(discovery_db):
+    results = run(discovery_db, DISCOVERY_RESULTS_QUERY)
+    two_queries = finalized(run(discovery_db, 'query_discovery.sql'), run(discovery_db, 'query_DiscoveryAL.sql'))
+    single_query = finalized(project_discovery(results), project_discovery_al(results))
+    for expected, actual in zip(two_queries, single_query):
+        pd.testing.assert_frame_equal(canonical(actual), canonical(expected))
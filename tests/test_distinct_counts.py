@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench import learner_frame
+from distinct_counts import DailyDistinctCounts, SketchedDistinctCounts
+
+
+@pytest.fixture(scope='module')
+def frame():
+    df = learner_frame(100_000, learners=20_000, days=700)
+    df.loc[df.index % 53 == 0, 'created_at'] = pd.NaT
+    return df
+
+
+def random_ranges(count, seed=1, days=700):
+    rng = np.random.default_rng(seed)
+    return [sorted(pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(-5, days + 5, 2), 'D')) for _ in range(count)]
+
+
+def nunique(df, start, end, **selected):
+    rows = df['created_at'].between(start, end)
+    for column, value in selected.items():
+        if value is not None:
+            rows &= df[column] == value
+    return df.loc[rows, 'learner_id'].nunique()
+
+
+@pytest.mark.parametrize('max_dates', [2000, 10])
+def test_daily_counts_match_nunique(frame, max_dates):
+    # max_dates=10 makes every group too wide for a table, so the direct count is checked too
+    groups = {'platform': frame['platform'], 'status_learner': frame['status_learner']}
+    counts = DailyDistinctCounts(frame['created_at'], frame['learner_id'], groups, max_dates=max_dates)
+    for start, end in random_ranges(100):
+        for selected in [{}, {'platform': 'Discovery'}, {'platform': 'Capture', 'status_learner': 'Internal'},
+                         {'platform': 'Elsewhere'}, {'platform': None, 'status_learner': 'External'}]:
+            assert counts.count(start, end, **selected) == nunique(frame, start, end, **selected), (start, end, selected)
+
+
+def test_sketched_counts_stay_within_the_expected_error(frame):
+    groups = {'platform': frame['platform'], 'status_learner': frame['status_learner']}
+    sketches = SketchedDistinctCounts(frame['created_at'], frame['learner_id'], groups)
+    errors = []
+    for start, end in random_ranges(200):
+        for selected in [{}, {'platform': 'Discovery'}, {'platform': 'Capture', 'status_learner': 'Internal'}]:
+            expected = nunique(frame, start, end, **selected)
+            errors.append(abs(sketches.count(start, end, **selected) - expected) / max(expected, 1))
+    errors = np.array(errors)
+    print(f'HyperLogLog error over {len(errors)} ranges: mean {errors.mean():.2%}, max {errors.max():.2%}')
+    # The typical error at precision 12 is 1.6%; no range should be off by more than four times that
+    assert errors.mean() < 0.025
+    assert errors.max() < 0.065
+
+
+def test_sketched_counts_merge_lists_of_values(frame):
+    groups = {'status_learner': frame['status_learner']}
+    sketches = SketchedDistinctCounts(frame['created_at'], frame['learner_id'], groups)
+    both = sketches.count('2023-01-01', '2024-12-31', status_learner=['Internal', 'External'])
+    assert both == sketches.count('2023-01-01', '2024-12-31')
+    assert sketches.count('2023-01-01', '2024-12-31', status_learner='Elsewhere') == 0
+    assert sketches.count('2025-06-01', '2025-06-30') == 0
+
+
+def test_sketched_counts_do_not_depend_on_the_blocks(frame):
+    # Merging is exact on the registers, so splitting the days differently gives the same estimates
+    groups = {'platform': frame['platform'], 'status_learner': frame['status_learner']}
+    by_day = SketchedDistinctCounts(frame['created_at'], frame['learner_id'], groups, max_blocks=10_000)
+    blocked = SketchedDistinctCounts(frame['created_at'], frame['learner_id'], groups, max_blocks=8)
+    assert blocked._blocks.shape[1] <= 8
+    for start, end in random_ranges(100, seed=2):
+        for selected in [{}, {'platform': 'Discovery'}, {'status_learner': ['Internal', 'External']}]:
+            assert blocked.count(start, end, **selected) == by_day.count(start, end, **selected), (start, end, selected)
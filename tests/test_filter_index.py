@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench import learner_frame
+from date_index import DateIndex
+from filter_index import FilterIndex, chosen
+
+COLUMNS = ['platform', 'status_learner', 'unit', 'title', 'Company']
+
+
+@pytest.fixture(scope='module')
+def frame():
+    df = learner_frame(50_000, learners=5_000)
+    # Missing values are selectable like any other value
+    df.loc[df.index % 97 == 0, 'unit'] = np.nan
+    return df
+
+
+def masked(df, selections, start=None, end=None):
+    if start is not None:
+        df = df[df['created_at'].between(start, end)]
+    for column, values in selections.items():
+        if values:
+            df = df[df[column].isin(values)]
+    return df
+
+
+def test_selections_match_chained_masks(frame):
+    index = FilterIndex(frame, COLUMNS)
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        selections = {}
+        for column in rng.choice(COLUMNS, rng.integers(0, len(COLUMNS) + 1), replace=False):
+            values = pd.unique(frame[column].dropna())
+            selections[column] = list(rng.choice(values, rng.integers(0, min(len(values), 300) + 1), replace=False))
+        if rng.random() < 0.2:
+            selections['unit'] = selections.get('unit', []) + [np.nan]
+        assert index.select(frame, selections).index.equals(masked(frame, selections).index)
+
+
+def test_selections_within_a_date_range(frame):
+    index = FilterIndex(frame, COLUMNS)
+    dates = DateIndex(frame['created_at'])
+    selections = {'platform': chosen('Discovery'), 'title': ['GI', 'LEAN'], 'status_learner': chosen('All')}
+    within = dates.positions_between('2023-03-01', '2023-09-30')
+    expected = masked(frame, selections, pd.Timestamp('2023-03-01'), pd.Timestamp('2023-09-30'))
+    assert index.select(frame, selections, within).index.equals(expected.index)
+
+
+def test_rejects_another_frame(frame):
+    index = FilterIndex(frame, COLUMNS)
+    with pytest.raises(ValueError):
+        index.select(frame.iloc[:10], {})
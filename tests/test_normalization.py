@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from bench import normalize_gender_per_row
+from normalization import clean_company, layer_group, normalize_gender
+
+
+def test_gender_matches_the_per_row_path():
+    rng = np.random.default_rng(0)
+    genders = pd.Series(rng.choice(['Male', 'perempuan', ' F', 'laki - laki', 'N/A', None, 'Wanita', 'pria', 'm '], 10_000))
+    expected = genders.apply(normalize_gender_per_row)
+    assert normalize_gender(genders).astype(object).equals(expected.astype(object))
+    assert normalize_gender(genders.astype('category')).astype(object).equals(expected.astype(object))
+
+
+def test_company_placeholders_become_na():
+    rng = np.random.default_rng(0)
+    companies = pd.Series(rng.choice(['KG', '-', 'NA', 'Gramedia', '0', 'N/a', 'Kompas', '.', ' - '], 10_000))
+    expected = companies.replace(['-', '.', '0', 'n/a', 'N/a', 'NA'], 'N/A', regex=False)
+    # A placeholder surrounded by spaces is cleaned too, as is a 0 read as a number
+    expected[companies == ' - '] = 'N/A'
+    assert clean_company(companies).astype(object).equals(expected.astype(object))
+    assert clean_company(pd.Series([0, 'KG'], dtype=object)).tolist() == ['N/A', 'KG']
+
+
+def test_unknown_layers_get_no_group():
+    groups = layer_group(pd.Series(['Group 5 Str Layer 1', 'Group 2', 'Director', None]))
+    assert groups.iloc[:2].tolist() == ['Layer 1', 'Non Struktural']
+    assert groups.iloc[2:].isna().all()